@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import geography
+from local_backend import connect_backend
+from route_queries import OPTIMIZED_STOPS, UNOPTIMIZED_STOPS
+from sql_templates import HOME, bind, origin_params, query
+
+# The route analysis of pages 5-7 for many origins in one pass: the nearest
+# Best Buy, liquor store and coffee shop, the shops nearest that Best Buy, the
+# route and optimized route lengths, the optimized route as a polygon, its
+# perimeter and the shops inside it. The shop views are loaded once into a
+# shop_index.ShopIndex; origins are read from a CSV in chunks, each chunk's
+# stops are found with NumPy-vectorized haversine distances on a process pool,
+# and results are streamed out as newline-delimited GeoJSON (.geojsonl), RFC
+# 8142 GeoJSON text sequences (.geojsonseq) or Parquet (needs pyarrow).
+#
+#   python batch_routes.py addresses.csv routes.geojsonl --lon-column longitude --lat-column latitude
+#   python batch_routes.py addresses.csv routes.parquet --backend snowflake --workers 8
+
+FORMATS = {".geojsonl": "geojsonl", ".geojsonseq": "geojsonseq", ".parquet": "parquet"}
+
+def load_index(backend, extract=None, arrow=False):
+	from shop_index import ShopIndex
+	conn = connect_backend(backend, extract)
+	try:
+		sql, values = bind(query("shop_points"))
+		with conn.cursor() as cur:
+			cur.execute(sql, values)
+			return ShopIndex.from_arrow(cur.fetch_arrow_all()) if arrow else ShopIndex.from_rows(cur.fetchall())
+	finally:
+		conn.close()
+
+# (id, lon, lat) per CSV row; the row number is the id without an id column
+def read_origins(path, lon_column, lat_column, id_column=None):
+	with open(path, newline="") as f:
+		for n, row in enumerate(csv.DictReader(f), 1):
+			yield row[id_column] if id_column else n, float(row[lon_column]), float(row[lat_column])
+
+def chunked(items, size):
+	chunk = []
+	for item in items:
+		chunk.append(item)
+		if len(chunk) == size:
+			yield chunk
+			chunk = []
+	if chunk:
+		yield chunk
+
+# the index of the worker process, sent once by the pool initializer
+_index = None
+
+def _init_worker(index):
+	global _index
+	_index = index
+
+def _stop(index, i, distance):
+	return {"id": index.ids[i], "name": index.names[i], "lon": float(index.lon[i]), "lat": float(index.lat[i]), "distance_meters": float(distance)}
+
+# home, the stops that were found in visiting order, and home again, as in route_queries.Route
+def _line(home, found, order):
+	return {"type": "LineString", "coordinates": [home] + [[found[stop]["lon"], found[stop]["lat"]] for stop in order if stop in found] + [home]}
+
+# one record per origin of the chunk, as the pages would compute it for that origin
+def analyze(chunk, options, shops_in_polygon=True, index=None):
+	from shop_index import LOCATION_STOPS, locations_many
+	index = _index if index is None else index
+	stops = locations_many(index, [lon for _, lon, _ in chunk], [lat for _, _, lat in chunk], origin_params(*HOME, **options))
+	records = []
+	for n, (origin_id, lon, lat) in enumerate(chunk):
+		found = {stop: _stop(index, stops[stop][0][n], stops[stop][1][n]) for stop in LOCATION_STOPS if stops[stop][0][n] >= 0}
+		home = [lon, lat]
+		route, optimized = _line(home, found, UNOPTIMIZED_STOPS), _line(home, found, OPTIMIZED_STOPS)
+		record = {"id": origin_id, "lon": lon, "lat": lat, "stops": found, "length_meters": geography.length(route), "optimized_length_meters": geography.length(optimized)}
+		# a polygon needs three distinct stops besides home
+		if len(optimized["coordinates"]) >= 5:
+			polygon = geography.makepolygon(optimized)
+			record["geometry"] = polygon
+			record["perimeter_meters"] = geography.perimeter(polygon)
+			if shops_in_polygon:
+				inside = index.within_polygon(polygon["coordinates"])
+				record["shops_in_polygon"] = len(inside)
+		else:
+			record["geometry"] = optimized
+		records.append(record)
+	return records
+
+# one feature per line; as an RFC 8142 text sequence, each line also starts
+# with the record separator
+class GeoJSONSeqWriter:
+	def __init__(self, path, separator=""):
+		self._file = open(path, "w")
+		self._separator = separator
+
+	def write(self, records):
+		for record in records:
+			properties = {key: value for key, value in record.items() if key != "geometry"}
+			self._file.write(self._separator + json.dumps({"type": "Feature", "geometry": record["geometry"], "properties": properties}, separators=(",", ":"), default=str) + "\n")
+
+	def close(self):
+		self._file.close()
+
+# flat columns per stop, the geometry as WKB; one row group per chunk
+class ParquetWriter:
+	def __init__(self, path):
+		import pyarrow as pa
+		import pyarrow.parquet as pq
+		from shop_index import LOCATION_STOPS
+		self._pa = pa
+		fields = [("id", pa.string()), ("lon", pa.float64()), ("lat", pa.float64())]
+		for stop in LOCATION_STOPS:
+			fields += [(stop + "_id", pa.string()), (stop + "_name", pa.string()), (stop + "_distance_meters", pa.float64())]
+		fields += [("length_meters", pa.float64()), ("optimized_length_meters", pa.float64()), ("perimeter_meters", pa.float64()), ("shops_in_polygon", pa.int64()), ("geometry", pa.binary())]
+		self._stops = LOCATION_STOPS
+		self._schema = pa.schema(fields)
+		self._writer = pq.ParquetWriter(path, self._schema)
+
+	def write(self, records):
+		columns = {name: [] for name in self._schema.names}
+		for record in records:
+			columns["id"].append(str(record["id"]))
+			columns["lon"].append(record["lon"])
+			columns["lat"].append(record["lat"])
+			for stop in self._stops:
+				found = record["stops"].get(stop, {})
+				columns[stop + "_id"].append(None if not found else str(found["id"]))
+				columns[stop + "_name"].append(found.get("name"))
+				columns[stop + "_distance_meters"].append(found.get("distance_meters"))
+			for name in ("length_meters", "optimized_length_meters", "perimeter_meters", "shops_in_polygon"):
+				columns[name].append(record.get(name))
+			columns["geometry"].append(geography.to_wkb(record["geometry"]))
+		self._writer.write_table(self._pa.table(columns, schema=self._schema))
+
+	def close(self):
+		self._writer.close()
+
+def main():
+	parser = argparse.ArgumentParser(description="Compute the pages 5-7 route analysis for every origin of a CSV")
+	parser.add_argument("origins", help="CSV file with one origin per row")
+	parser.add_argument("output", help="output file, .geojsonl/.geojsonseq or .parquet")
+	parser.add_argument("--lon-column", default="lon")
+	parser.add_argument("--lat-column", default="lat")
+	parser.add_argument("--id-column", help="column identifying each origin (default: the row number)")
+	parser.add_argument("--backend", choices=("local", "snowflake"), default="local")
+	parser.add_argument("--extract", help="path of the local extract (local backend only)")
+	parser.add_argument("--arrow", action="store_true", help="load the shop index through the Arrow fetch path")
+	parser.add_argument("--radius", type=float, default=1600)
+	parser.add_argument("--store-name", default="Best Buy")
+	parser.add_argument("--liquor-shop", default="alcohol")
+	parser.add_argument("--coffee-shop", default="coffee")
+	parser.add_argument("--no-shops-in-polygon", dest="shops_in_polygon", action="store_false", help="skip counting the shops inside each polygon")
+	parser.add_argument("--chunk-size", type=int, default=2000)
+	parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes, 0 to run in this process")
+	args = parser.parse_args()
+	kind = FORMATS.get(os.path.splitext(args.output)[1].lower())
+	if kind is None:
+		parser.error("output must end with one of %s" % ", ".join(FORMATS))
+	options = {"radius": args.radius, "store_name": args.store_name, "liquor_shop": args.liquor_shop, "coffee_shop": args.coffee_shop}
+
+	started = time.perf_counter()
+	index = load_index(args.backend, args.extract, args.arrow)
+	print("loaded %d shops in %.1fs" % (len(index), time.perf_counter() - started), file=sys.stderr)
+
+	if kind == "parquet":
+		writer = ParquetWriter(args.output)
+	else:
+		writer = GeoJSONSeqWriter(args.output, "\x1e" if kind == "geojsonseq" else "")
+	chunks = chunked(read_origins(args.origins, args.lon_column, args.lat_column, args.id_column), args.chunk_size)
+	done = 0
+	started = time.perf_counter()
+	def report(records):
+		nonlocal done
+		writer.write(records)
+		done += len(records)
+		print("%d origins, %.0f origins/s" % (done, done / (time.perf_counter() - started)), file=sys.stderr)
+	try:
+		if args.workers == 0:
+			for chunk in chunks:
+				report(analyze(chunk, options, args.shops_in_polygon, index))
+		else:
+			# at most two chunks per worker in flight, written in input order
+			with ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(index,)) as executor:
+				pending = deque()
+				for chunk in chunks:
+					pending.append(executor.submit(analyze, chunk, options, args.shops_in_polygon))
+					if len(pending) >= 2 * args.workers:
+						report(pending.popleft().result())
+				while pending:
+					report(pending.popleft().result())
+	finally:
+		writer.close()
+	elapsed = time.perf_counter() - started
+	print("wrote %d origins to %s in %.1fs: %.0f origins/s" % (done, args.output, elapsed, done / elapsed if elapsed else 0), file=sys.stderr)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from local_backend import connect_backend
+from sql_templates import bind, query
+
+# Compares the tuple fetch path (cursor.fetchall) with the Arrow paths
+# (fetch_arrow_all, and streaming fetch_arrow_batches without keeping the
+# batches) on one large result set. Each run happens in a fresh process so the
+# peak RSS of one mode does not hide the next. The app itself only uses
+# fetch_arrow_all; arrow-batches shows what streaming would save.
+#
+#   python benchmarks/bench_fetch.py --backend local --template shop_points
+#   python benchmarks/bench_fetch.py --backend snowflake --sql "select seq8(), uniform(0::float, 1::float, random()) from table(generator(rowcount => 5000000))"
+
+MODES = ("tuples", "arrow", "arrow-batches")
+
+def peak_rss_bytes():
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return peak if sys.platform == "darwin" else peak * 1024
+
+# pyarrow, and the connector's Arrow extension, are loaded before a run is
+# measured, so that their import time and memory are not counted as fetching;
+# the first conversion to an array also loads modules pyarrow imports lazily
+def preload_arrow(backend):
+	import pyarrow
+	pyarrow.array([0])
+	if backend == "snowflake":
+		for module in ("snowflake.connector.nanoarrow_arrow_iterator", "snowflake.connector.arrow_iterator"):
+			try:
+				importlib.import_module(module)
+				break
+			except ImportError:
+				pass
+
+def run_once(backend, extract, mode, sql, values, results):
+	try:
+		measure(backend, extract, mode, sql, values, results)
+	except Exception as e:
+		results.put({"error": "%s: %s" % (type(e).__name__, e)})
+
+def measure(backend, extract, mode, sql, values, results):
+	if mode != "tuples":
+		preload_arrow(backend)
+	conn = connect_backend(backend, extract)
+	try:
+		before = peak_rss_bytes()
+		start = time.perf_counter()
+		with conn.cursor() as cur:
+			cur.execute(sql, values)
+			if mode == "tuples":
+				result = cur.fetchall()
+				rows = len(result)
+			elif mode == "arrow":
+				result = cur.fetch_arrow_all()
+				rows = 0 if result is None else result.num_rows
+			else:
+				rows = sum(batch.num_rows for batch in cur.fetch_arrow_batches())
+		elapsed = time.perf_counter() - start
+		results.put({"seconds": elapsed, "rows": rows, "peak_rss_growth": peak_rss_bytes() - before})
+	finally:
+		conn.close()
+
+def main():
+	parser = argparse.ArgumentParser(description="Compare tuple and Arrow fetch paths on one result set")
+	parser.add_argument("--backend", choices=("local", "snowflake"), default="local")
+	parser.add_argument("--extract", help="path of the local extract (local backend only)")
+	parser.add_argument("--template", default="shop_points", help="sql_templates id to run (without parameters)")
+	parser.add_argument("--sql", help="run this statement instead of a template")
+	parser.add_argument("--repeat", type=int, default=5)
+	parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+	parser.add_argument("--json", help="also write the summary to this file")
+	args = parser.parse_args()
+	sql, values = (args.sql, []) if args.sql else bind(query(args.template))
+	context = multiprocessing.get_context("spawn")
+	summary = {}
+	for mode in args.modes:
+		runs = []
+		for _ in range(args.repeat):
+			results = context.Queue()
+			process = context.Process(target=run_once, args=(args.backend, args.extract, mode, sql, values, results))
+			process.start()
+			run = results.get()
+			process.join()
+			if "error" in run:
+				sys.exit("%s failed: %s" % (mode, run["error"]))
+			runs.append(run)
+		summary[mode] = {
+			"rows": runs[0]["rows"],
+			"median_seconds": statistics.median(run["seconds"] for run in runs),
+			"min_seconds": min(run["seconds"] for run in runs),
+			"median_peak_rss_growth_mb": statistics.median(run["peak_rss_growth"] for run in runs) / 2 ** 20,
+		}
+		print("%-14s rows=%-9d median=%.3fs min=%.3fs peak rss growth=%.1f MB" % (mode, summary[mode]["rows"], summary[mode]["median_seconds"], summary[mode]["min_seconds"], summary[mode]["median_peak_rss_growth_mb"]))
+	if args.json:
+		with open(args.json, "w") as f:
+			json.dump({"backend": args.backend, "sql": sql, "repeat": args.repeat, "modes": summary}, f, indent=2)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager, get_context
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_fetch import peak_rss_bytes
+
+# Drives every sidebar page, and every "** All Visuals **" selection, of the
+# app through Streamlit's AppTest with N concurrent simulated sessions. AppTest
+# sets and clears a process-wide runtime on every run, so concurrent runs in
+# one process break each other; each session runs in its own process instead,
+# like sessions spread over server replicas. They share the on-disk query
+# cache, which starts empty, but not the singletons and memo caches.
+#
+#   python benchmarks/bench_pages.py --sessions 8 --rounds 5 --json pages.json
+#   python benchmarks/bench_pages.py --sessions 8 --rounds 5 --compare pages.json
+#
+# Render latency is measured per step: the script runs that switch to its page
+# and selection, or one rerun when already there. Queries issued to the
+# backend and cache outcomes come from the app's own trace export.
+
+APP = os.path.join(ROOT, "quickstart_getting_started_with_geospatial_geography.py")
+
+PAGES = ("Home", "5.Calculations and More Constructors", "6.Joins", "7.Additional Calculations and Constructors")
+VISUALS = ("Point", "Unoptimized Linestring", "Optimized Linestring", "Polygon", "Polygon with Points")
+
+STEPS = [(page, None) for page in PAGES] + [("** All Visuals **", selection) for selection in VISUALS] + [("Explore", None)]
+
+_SAMPLE = re.compile(r'^(\w+)\{(.*)\} (\S+)$')
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+def step_name(step):
+	page, selection = step
+	return page if selection is None else "%s / %s" % (page, selection)
+
+def percentiles(values):
+	values = sorted(values)
+	def at(q):
+		return values[min(len(values) - 1, max(0, int(round(q * len(values))) - 1))]
+	return {"count": len(values), "p50": at(0.5), "p95": at(0.95), "p99": at(0.99), "max": values[-1], "mean": statistics.mean(values)}
+
+def revision():
+	try:
+		return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+def app_secrets(args, workdir):
+	if args.backend == "local":
+		from local_backend import DEFAULT_EXTRACT
+		secrets = {"geo-hol-backend": "local", "geo-hol-local": {"path": args.extract or DEFAULT_EXTRACT}}
+	else:
+		from local_backend import load_secrets
+		secrets = dict(load_secrets(), **{"geo-hol-backend": "snowflake"})
+	secrets["geo-hol-cache"] = {"path": os.path.join(workdir, "cache.sqlite")}
+	secrets["geo-hol-trace"] = {"path": os.path.join(workdir, "trace.prom"), "export_interval": 0, "max_spans": 1000000}
+	if args.shop_index:
+		secrets["geo-hol-shop-index"] = True
+	if args.arrow:
+		secrets["geo-hol-fetch"] = "arrow"
+	return secrets
+
+# one simulated user in a process of its own: every step in a shuffled order,
+# per round; returns the latencies per step, the errors and the peak RSS
+def session(n, args, secrets, start):
+	from streamlit.testing.v1 import AppTest
+	os.chdir(ROOT)
+	latencies, errors = {}, []
+	at = AppTest.from_file(APP, default_timeout=args.timeout)
+	for name, value in secrets.items():
+		at.secrets[name] = value
+	order = random.Random(args.seed + n)
+	start.wait()
+	try:
+		began = time.perf_counter()
+		at.run()
+		if at.exception:
+			raise RuntimeError(at.exception[0].message)
+		latencies.setdefault("(first run)", []).append(time.perf_counter() - began)
+	except Exception as e:
+		errors.append("(first run): %s: %s" % (type(e).__name__, e))
+		return latencies, errors, peak_rss_bytes()
+	for _ in range(args.rounds):
+		steps = list(STEPS)
+		order.shuffle(steps)
+		for step in steps:
+			page, selection = step
+			try:
+				began = time.perf_counter()
+				ran = False
+				if at.sidebar.radio[0].value != page:
+					at.sidebar.radio[0].set_value(page).run()
+					ran = True
+				if selection is not None and at.selectbox[0].value != selection:
+					at.selectbox[0].set_value(selection).run()
+					ran = True
+				if not ran:
+					at.run()
+				elapsed = time.perf_counter() - began
+				if at.exception:
+					raise RuntimeError(at.exception[0].message)
+				latencies.setdefault(step_name(step), []).append(elapsed)
+			except Exception as e:
+				errors.append("%s: %s: %s" % (step_name(step), type(e).__name__, e))
+	return latencies, errors, peak_rss_bytes()
+
+# counters and summaries of the OpenMetrics trace exports of all sessions
+def read_trace(paths):
+	samples = []
+	for path in paths:
+		if os.path.exists(path):
+			with open(path) as f:
+				for line in f:
+					match = _SAMPLE.match(line.strip())
+					if match:
+						samples.append((match.group(1), dict(_LABEL.findall(match.group(2))), float(match.group(3))))
+	cache = {}
+	fetches = 0
+	for metric, labels, value in samples:
+		if metric == "geo_hol_span_cache_total" and labels["kind"] == "query":
+			cache[labels["cache"]] = cache.get(labels["cache"], 0) + int(value)
+		elif metric == "geo_hol_span_seconds_count" and labels["kind"] == "fetch":
+			fetches += int(value)
+	queries = sum(cache.values())
+	return {
+		"queries": queries,
+		"queries_issued": fetches,
+		"cache_outcomes": cache,
+		"cache_hit_ratio": (queries - cache.get("warehouse", 0)) / queries if queries else None,
+	}
+
+def compare(previous, current):
+	print("\n%-55s %10s %10s %8s" % ("step (p95 seconds)", "previous", "current", "change"))
+	for name, stats in current["steps"].items():
+		before = previous.get("steps", {}).get(name)
+		if before:
+			print("%-55s %10.3f %10.3f %+7.1f%%" % (name, before["p95"], stats["p95"], 100 * (stats["p95"] / before["p95"] - 1) if before["p95"] else 0))
+	for field in ("queries_issued", "cache_hit_ratio", "peak_rss_mb"):
+		print("%-55s %10s %10s" % (field, previous.get(field), current.get(field)))
+
+def main():
+	parser = argparse.ArgumentParser(description="Page render and query latency of the app under concurrent simulated sessions")
+	parser.add_argument("--backend", choices=("local", "snowflake"), default="local")
+	parser.add_argument("--extract", help="path of the local extract (local backend only)")
+	parser.add_argument("--sessions", type=int, default=4)
+	parser.add_argument("--rounds", type=int, default=3, help="passes over every step per session")
+	parser.add_argument("--seed", type=int, default=0, help="seed of the per-session step order")
+	parser.add_argument("--timeout", type=float, default=60, help="seconds allowed for one script run")
+	parser.add_argument("--shop-index", action="store_true", help="run with the in-process shop index")
+	parser.add_argument("--arrow", action="store_true", help="run with the Arrow fetch mode")
+	parser.add_argument("--json", help="write the results to this file")
+	parser.add_argument("--compare", help="print the change against results written earlier with --json")
+	args = parser.parse_args()
+	os.chdir(ROOT)
+	with tempfile.TemporaryDirectory(prefix="geo-hol-bench-") as workdir:
+		secrets = app_secrets(args, workdir)
+		# every session exports its trace to a file of its own
+		traces = [os.path.join(workdir, "trace-%d.prom" % n) for n in range(args.sessions)]
+		latencies, errors, peak_rss = {}, [], 0
+		with Manager() as manager, ProcessPoolExecutor(args.sessions, mp_context=get_context("spawn")) as executor:
+			start = manager.Barrier(args.sessions)
+			began = time.perf_counter()
+			futures = [executor.submit(session, n, args, dict(secrets, **{"geo-hol-trace": dict(secrets["geo-hol-trace"], path=traces[n])}), start) for n in range(args.sessions)]
+			for future in futures:
+				session_latencies, session_errors, session_rss = future.result()
+				for name, values in session_latencies.items():
+					latencies.setdefault(name, []).extend(values)
+				errors += session_errors
+				peak_rss = max(peak_rss, session_rss)
+			wall = time.perf_counter() - began
+		trace = read_trace(traces)
+	for error in errors[:10]:
+		print("error:", error, file=sys.stderr)
+	if not latencies:
+		sys.exit("no step completed")
+	results = {
+		"revision": revision(),
+		"backend": args.backend,
+		"sessions": args.sessions,
+		"rounds": args.rounds,
+		"seed": args.seed,
+		"shop_index": args.shop_index,
+		"arrow": args.arrow,
+		"wall_seconds": wall,
+		"errors": len(errors),
+		"overall": percentiles([value for values in latencies.values() for value in values]),
+		"steps": {name: percentiles(latencies[name]) for name in ["(first run)"] + [step_name(step) for step in STEPS] if name in latencies},
+		"peak_rss_mb": peak_rss / 2 ** 20,
+		**trace,
+	}
+	print("%-55s %6s %8s %8s %8s %8s" % ("step (seconds)", "runs", "p50", "p95", "p99", "max"))
+	for name, stats in list(results["steps"].items()) + [("overall", results["overall"])]:
+		print("%-55s %6d %8.3f %8.3f %8.3f %8.3f" % (name, stats["count"], stats["p50"], stats["p95"], stats["p99"], stats["max"]))
+	ratio = results["cache_hit_ratio"]
+	print("\nqueries=%d issued to the backend=%d cache hit ratio=%s peak rss=%.1f MB wall=%.1fs errors=%d" % (results["queries"], results["queries_issued"], "n/a" if ratio is None else "%.3f" % ratio, results["peak_rss_mb"], wall, len(errors)))
+	if args.compare:
+		with open(args.compare) as f:
+			compare(json.load(f), results)
+	if args.json:
+		with open(args.json, "w") as f:
+			json.dump(results, f, indent=2)
+	if errors:
+		sys.exit("%d of the steps failed, their latencies are missing from the percentiles" % len(errors))
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Bounded pool of warehouse connections shared by every session of the app.
+# Idle connections are pinged in the background so the session stays alive,
+# and connections that fail a ping or break while in use are replaced.
+
+class PoolTimeout(Exception):
+	pass
+
+def default_ping(conn):
+	with conn.cursor() as cur:
+		cur.execute("select 1")
+		cur.fetchone()
+
+class ConnectionPool:
+	def __init__(self, connect, min_size=1, max_size=8, checkout_timeout=30, keepalive=300, ping=default_ping):
+		self._connect = connect
+		self.min_size = min_size
+		self.max_size = max_size
+		self.checkout_timeout = checkout_timeout
+		self.keepalive = keepalive
+		self._ping = ping
+		self._idle = deque()
+		self._size = 0
+		self._closed = False
+		self._cond = threading.Condition()
+		self._metrics = {"checkouts": 0, "timeouts": 0, "created": 0, "discarded": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
+		for _ in range(min_size):
+			self._size += 1
+			self._idle.append((self._create(), time.monotonic()))
+		self._keepalive_thread = threading.Thread(target=self._keepalive_loop, name="geo-hol-pool-keepalive", daemon=True)
+		self._keepalive_thread.start()
+
+	# Connect outside the lock into a slot already counted in _size, so that
+	# concurrent checkouts never connect past max_size; the slot is freed
+	# again when connecting fails.
+	def _create(self):
+		try:
+			conn = self._connect()
+		except BaseException:
+			with self._cond:
+				self._size -= 1
+				self._cond.notify()
+			raise
+		with self._cond:
+			self._metrics["created"] += 1
+		return conn
+
+	def _discard(self, conn):
+		try:
+			conn.close()
+		except Exception:
+			pass
+		with self._cond:
+			self._size -= 1
+			self._metrics["discarded"] += 1
+			self._cond.notify()
+
+	def _healthy(self, conn, idle_since):
+		if getattr(conn, "is_closed", lambda: False)():
+			return False
+		if time.monotonic() - idle_since < self.keepalive:
+			return True
+		try:
+			self._ping(conn)
+			return True
+		except Exception:
+			return False
+
+	def checkout(self):
+		start = time.monotonic()
+		deadline = start + self.checkout_timeout
+		while True:
+			conn = None
+			with self._cond:
+				while not self._idle and self._size >= self.max_size:
+					remaining = deadline - time.monotonic()
+					if remaining <= 0:
+						self._metrics["timeouts"] += 1
+						raise PoolTimeout("no connection available after %ss (%s in use)" % (self.checkout_timeout, self._size))
+					self._cond.wait(remaining)
+				if self._idle:
+					conn, idle_since = self._idle.pop()
+				else:
+					self._size += 1
+			if conn is None:
+				conn = self._create()
+			elif not self._healthy(conn, idle_since):
+				self._discard(conn)
+				continue
+			waited = time.monotonic() - start
+			with self._cond:
+				self._metrics["checkouts"] += 1
+				self._metrics["wait_seconds_total"] += waited
+				self._metrics["wait_seconds_max"] = max(self._metrics["wait_seconds_max"], waited)
+			return conn
+
+	def checkin(self, conn, broken=False):
+		if broken or self._closed or getattr(conn, "is_closed", lambda: False)():
+			self._discard(conn)
+			return
+		with self._cond:
+			self._idle.append((conn, time.monotonic()))
+			self._cond.notify()
+
+	# borrow a connection for the duration of a with block; a connection that
+	# raised and can no longer answer a ping is replaced instead of returned
+	@contextmanager
+	def connection(self):
+		conn = self.checkout()
+		try:
+			yield conn
+		except Exception:
+			self.checkin(conn, broken=not self._healthy(conn, float("-inf")))
+			raise
+		self.checkin(conn)
+
+	def _keepalive_loop(self):
+		while not self._closed:
+			time.sleep(max(1, self.keepalive / 2))
+			with self._cond:
+				stale = [item for item in self._idle if time.monotonic() - item[1] >= self.keepalive]
+				for item in stale:
+					self._idle.remove(item)
+			for conn, idle_since in stale:
+				if self._healthy(conn, idle_since):
+					self.checkin(conn)
+				else:
+					self._discard(conn)
+			while not self._closed:
+				with self._cond:
+					if self._size >= self.min_size:
+						break
+					self._size += 1
+				try:
+					self.checkin(self._create())
+				except Exception:
+					break
+
+	def metrics(self):
+		with self._cond:
+			metrics = dict(self._metrics)
+			metrics.update(size=self._size, idle=len(self._idle), in_use=self._size - len(self._idle), max_size=self.max_size)
+		return metrics
+
+	def close(self):
+		self._closed = True
+		with self._cond:
+			idle = list(self._idle)
+			self._idle.clear()
+		for conn, _ in idle:
+			self._discard(conn)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+import math
+import threading
+from collections import OrderedDict, namedtuple
+
+from geography import EARTH_RADIUS, haversine
+from sql_templates import query
+
+# Incremental exploration of the shops around a movable origin and radius.
+# The map is covered by lon/lat tiles, each fetched once with its own cached
+# query and then kept in process, so moving the origin only fetches the tiles
+# that come into view. Tiles grow in powers of two with the radius, like the
+# zoom levels of a web map, so a view needs at most 3 x 3 tiles at any radius.
+# Tiles as large as those of cluster_radius or larger are fetched as shop
+# counts per cell of a grid 8 times finer, aggregated in the warehouse; point
+# results over max_points are clustered on the same cells, so a view never
+# draws more than a bounded number of markers.
+
+TILE_DEGREES = 0.01
+CELL_DEGREES = TILE_DEGREES / 8
+
+# meters per degree of latitude
+_METERS_PER_DEGREE = math.pi * EARTH_RADIUS / 180
+
+# points are (id, lon, lat, name, shop, distance), closest first; clusters are
+# (shops, lon, lat) with the mean position of their shops. shops is only
+# approximate when the warehouse clustered the tiles: a cell's shops are kept
+# or dropped together, by the distance of their mean position.
+Exploration = namedtuple("Exploration", "points clusters shops tiles fetched approximate")
+
+def _half_width(lat, meters):
+	return meters / _METERS_PER_DEGREE / max(math.cos(math.radians(lat)), 1e-6)
+
+# the tile size for a circle: the smallest power of two times TILE_DEGREES at
+# least as wide as its radius
+def tile_size(lat, meters):
+	dlon = _half_width(lat, meters)
+	return TILE_DEGREES * 2 ** math.ceil(math.log2(dlon / TILE_DEGREES)) if dlon > TILE_DEGREES else TILE_DEGREES
+
+# the tiles overlapping the bounding box of a circle
+def tiles(lon, lat, meters, size=TILE_DEGREES):
+	dlat = meters / _METERS_PER_DEGREE
+	dlon = _half_width(lat, meters)
+	xs = range(math.floor((lon - dlon) / size), math.floor((lon + dlon) / size) + 1)
+	ys = range(math.floor((lat - dlat) / size), math.floor((lat + dlat) / size) + 1)
+	return [(x, y) for x in xs for y in ys]
+
+def tile_query(tile, clustered=False, size=TILE_DEGREES, cell=CELL_DEGREES):
+	x, y = tile
+	bounds = {"min_lon": round(x * size, 9), "max_lon": round((x + 1) * size, 9), "min_lat": round(y * size, 9), "max_lat": round((y + 1) * size, 9)}
+	if clustered:
+		return query("tile_clusters", cell=cell, **bounds)
+	return query("tile_shops", **bounds)
+
+# process-wide rows per (size, tile, clustered), least recently used dropped first
+class TileCache:
+	def __init__(self, max_tiles=4096):
+		self.max_tiles = max_tiles
+		self._tiles = OrderedDict()
+		self._lock = threading.Lock()
+
+	# rows of every key, calling fetch(missing keys) -> {key: rows} once for
+	# the keys not cached yet; returns (rows per key, number fetched)
+	def get_many(self, keys, fetch):
+		with self._lock:
+			missing = [key for key in keys if key not in self._tiles]
+		fetched = fetch(missing) if missing else {}
+		with self._lock:
+			self._tiles.update(fetched)
+			found = {}
+			for key in keys:
+				found[key] = self._tiles[key] if key in self._tiles else fetched[key]
+				self._tiles.move_to_end(key)
+			while len(self._tiles) > self.max_tiles:
+				self._tiles.popitem(last=False)
+		return found, len(missing)
+
+# clusters (shops, lon, lat) merged per grid cell, keeping their mean position
+def cluster(clusters, cell=CELL_DEGREES):
+	cells = {}
+	for count, lon, lat in clusters:
+		key = (math.floor(lon / cell), math.floor(lat / cell))
+		total, sum_lon, sum_lat = cells.get(key, (0, 0.0, 0.0))
+		cells[key] = (total + count, sum_lon + count * lon, sum_lat + count * lat)
+	return [(total, sum_lon / total, sum_lat / total) for total, sum_lon, sum_lat in cells.values()]
+
+# coarsen the grid until there are at most max_points clusters
+def _bounded(clusters, max_points, cell=CELL_DEGREES):
+	while len(clusters) > max_points:
+		cell *= 2
+		clusters = cluster(clusters, cell)
+	return clusters
+
+def _result(points, max_points, tiles, fetched, cell=CELL_DEGREES):
+	points.sort(key=lambda point: point[5])
+	if len(points) > max_points:
+		return Exploration([], _bounded(cluster([(1, p[1], p[2]) for p in points], cell), max_points, cell), len(points), tiles, fetched, False)
+	return Exploration(points, [], len(points), tiles, fetched, False)
+
+# shops within meters of lon/lat from cached tiles; fetch(queries) returns the
+# rows of each sql_templates query, in order
+def explore(lon, lat, meters, tile_cache, fetch, max_points=200, cluster_radius=4000):
+	size = tile_size(lat, meters)
+	cell = size / 8
+	# decided by the tile size, so that crossing cluster_radius within a size
+	# fetches nothing new
+	clustered = size >= tile_size(lat, cluster_radius)
+	keys = [(size, tile, clustered) for tile in tiles(lon, lat, meters, size)]
+	def fetch_tiles(missing):
+		return dict(zip(missing, fetch([tile_query(tile, clustered, size, cell) for _, tile, _ in missing])))
+	rows, fetched = tile_cache.get_many(keys, fetch_tiles)
+	if clustered:
+		clusters = [(count, c_lon, c_lat) for key in keys for _, _, count, c_lon, c_lat in rows[key] if haversine(lon, lat, c_lon, c_lat) <= meters]
+		return Exploration([], _bounded(clusters, max_points, cell), sum(c[0] for c in clusters), len(keys), fetched, True)
+	points = []
+	for key in keys:
+		for shop_id, p_lon, p_lat, name, shop in rows[key]:
+			distance = haversine(lon, lat, p_lon, p_lat)
+			if distance <= meters:
+				points.append((shop_id, p_lon, p_lat, name, shop, distance))
+	return _result(points, max_points, len(keys), fetched, cell)
+
+# the same from a shop_index.ShopIndex, without any query
+def explore_index(index, lon, lat, meters, max_points=200):
+	indices, distances = index.radius(lon, lat, meters)
+	points = [(index.ids[i], float(index.lon[i]), float(index.lat[i]), index.names[i], index.shops[i], float(d)) for i, d in zip(indices, distances)]
+	return _result(points, max_points, 0, 0)
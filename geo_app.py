@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+import inspect
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import streamlit as st
+from connection_pool import ConnectionPool
+from map_cache import MapCache, map_key
+from query_cache import QueryCache
+from route_queries import Route, locations_query
+from sql_templates import HOME, bind, cache_key, origin_params, query
+from tracing import Tracer, result_rows, result_size
+
+# Connections, caches, tracing and the query and map helpers shared by the
+# pages in geo_pages. Imported once per process; the connector, folium and
+# numpy are only imported when a page first runs a query, draws a map or
+# loads the shop index.
+
+# optional secrets.toml sections, which may be absent when running locally
+def secret(name, default=None):
+	try:
+		return st.secrets.get(name, default)
+	except FileNotFoundError:
+		return default
+
+# set once the connection pool exists, so that diagnostics do not open it
+_pool_started = threading.Event()
+
+# Initialize the pool of connections to Snowflake, on the first query.
+# Make sure that ~/.streamlit/secrets.toml exists and is populated; the pool can
+# be tuned in an optional [geo-hol-pool] section (min_size, max_size,
+# checkout_timeout, keepalive). With geo-hol-backend = "local" (or
+# GEO_HOL_BACKEND=local) queries run against the local extract instead.
+@st.experimental_singleton
+def init_connection():
+	_pool_started.set()
+	if os.environ.get("GEO_HOL_BACKEND", secret("geo-hol-backend", "snowflake")) == "local":
+		import local_backend
+		return ConnectionPool(partial(local_backend.connect, **secret("geo-hol-local", {})), **secret("geo-hol-pool", {}))
+	import snowflake.connector
+	options = dict(st.secrets["geo-hol"], paramstyle="numeric")
+	return ConnectionPool(lambda: snowflake.connector.connect(**options), **secret("geo-hol-pool", {}))
+
+# Shared on-disk result cache, optionally configured in a [geo-hol-cache] section
+# of secrets.toml (path, max_bytes, default_ttl, lock_timeout)
+@st.experimental_singleton
+def init_query_cache():
+	return QueryCache(**secret("geo-hol-cache", {}))
+
+query_cache = init_query_cache()
+
+# Tracing of page runs, queries, fetches and maps, kept in a ring buffer shared
+# by all sessions. An optional [geo-hol-trace] section of secrets.toml sets
+# max_spans, and a path the OpenMetrics text is written to at most every
+# export_interval seconds; geo-hol-diagnostics = true adds a page showing it.
+TRACE = secret("geo-hol-trace", {})
+SHOW_DIAGNOSTICS = bool(secret("geo-hol-diagnostics", False))
+
+@st.experimental_singleton
+def init_tracer():
+	return Tracer(TRACE.get("max_spans", 10000))
+
+tracer = init_tracer()
+
+# Columnar fetch mode (geo-hol-fetch = "arrow" in secrets.toml, needs pyarrow):
+# result sets that grow with the search area and the shop index load are
+# fetched whole with fetch_arrow_all as Arrow tables instead of lists of
+# tuples. The tables are pickled into the shared cache and the memo like any
+# other result; nothing here streams record batches.
+FETCH_ARROW = secret("geo-hol-fetch", "tuples") == "arrow"
+
+# queries are sql_templates.Query values, executed with server-side binds;
+# columnar results are Arrow tables (None when there are no rows). Worker
+# threads have no script run context, so they are handed the pool instead of
+# looking up the singleton.
+def execute_query(query, columnar=False, pool=None):
+	sql, values = bind(query)
+	if pool is None:
+		pool = init_connection()
+	with tracer.span("fetch", query.template) as span, pool.connection() as conn, conn.cursor() as cur:
+		cur.execute(sql, values)
+		result = cur.fetch_arrow_all() if columnar else cur.fetchall()
+		span["rows"], span["bytes"] = result_size(result)
+		span["query_id"] = cur.sfqid
+	tracer.annotate(cache="warehouse", query_id=span["query_id"])
+	return result
+
+def result_key(query, columnar=False):
+	return cache_key(query) + (":arrow" if columnar else "")
+
+# the prefetched result of this run, or the shared cache, which only reaches
+# the warehouse when no other run or replica has the result yet
+def _load_query(query, ttl=600, columnar=False):
+	future = prefetched().pop((query, columnar), None)
+	if future is not None:
+		result, cache = future.result()
+		tracer.annotate(cache=cache)
+		return result
+	tracer.annotate(cache="shared")
+	return query_cache.get_or_run(result_key(query, columnar), partial(execute_query, query, columnar), ttl)
+
+# the in-process memo sits in front of the shared cache
+MEMO_TTL = 600
+
+@st.experimental_memo(ttl=MEMO_TTL)
+def _run_query(query, ttl=600, columnar=False):
+	return _load_query(query, ttl, columnar)
+
+# traced as "memo" unless the memoized function ran; results that have to be
+# fresher than the memo keeps them skip it and only use the shared cache
+def run_query(query, ttl=600, columnar=False):
+	with tracer.span("query", query.template, cache="memo") as span:
+		result = _run_query(query, ttl, columnar) if ttl >= MEMO_TTL else _load_query(query, ttl, columnar)
+		span["rows"] = result_rows(result)
+	return result
+
+# Bounded thread pool shared by all sessions for prefetching page queries
+@st.experimental_singleton
+def init_prefetch_pool():
+	return ThreadPoolExecutor(max_workers=init_connection().max_size, thread_name_prefix="geo-hol-prefetch")
+
+# futures for the current script run of this session, consumed by run_query
+def prefetched():
+	if "prefetched" not in st.session_state:
+		st.session_state.prefetched = {}
+	return st.session_state.prefetched
+
+# run on the prefetch pool: the result, and "warehouse" if it had to be
+# fetched or "prefetch" if the shared cache had it
+def _prefetch_query(query, columnar, pool, ttl):
+	fetched = []
+	def fetch():
+		fetched.append(True)
+		return execute_query(query, columnar, pool)
+	result = query_cache.get_or_run(result_key(query, columnar), fetch, ttl)
+	return result, "warehouse" if fetched else "prefetch"
+
+# submit every query a page will need at once, so the page waits roughly as
+# long as the slowest query instead of the sum of all of them
+def prefetch(queries, ttl=600, columnar=False):
+	futures = prefetched()
+	missing = [query for query in queries if (query, columnar) not in futures]
+	if not missing:
+		return
+	pool, executor = init_connection(), init_prefetch_pool()
+	for query in missing:
+		futures[query, columnar] = executor.submit(tracer.bind(_prefetch_query), query, columnar, pool, ttl)
+
+# Optional in-process index of the shop views (geo-hol-shop-index = true in
+# secrets.toml, needs numpy). The route stops are then looked up in memory; the
+# index is rebuilt when the views' fingerprint, checked at most once a minute
+# across all processes, changes.
+USE_SHOP_INDEX = bool(secret("geo-hol-shop-index", False))
+
+@st.experimental_singleton
+def init_shop_index():
+	from shop_index import IndexCache
+	return IndexCache()
+
+def shop_index():
+	fingerprint = query_cache.get_or_run(cache_key(query("shop_index_fingerprint")), partial(execute_query, query("shop_index_fingerprint")), 60)
+	from shop_index import ShopIndex
+	if FETCH_ARROW:
+		return init_shop_index().get(fingerprint, lambda: ShopIndex.from_arrow(execute_query(query("shop_points"), columnar=True)))
+	return init_shop_index().get(fingerprint, lambda: ShopIndex.from_rows(execute_query(query("shop_points"))))
+
+def load_route(origin):
+	if USE_SHOP_INDEX:
+		from shop_index import locations_rows
+		return Route(locations_rows(shop_index(), origin), origin)
+	return Route(run_query(locations_query(origin)), origin)
+
+# Origin and filters of the scenario; the pages render and run every query
+# from the sql_templates registry with these parameters
+ORIGIN = origin_params(*HOME)
+
+ROUTE_QUERIES = () if USE_SHOP_INDEX else (locations_query(ORIGIN),)
+
+# Built folium maps and rendered map HTML, shared by all sessions and
+# optionally sized in a [geo-hol-maps] section of secrets.toml (max_entries)
+@st.experimental_singleton
+def init_map_cache():
+	return MapCache(**secret("geo-hol-maps", {}))
+
+map_cache = init_map_cache()
+
+# draw an interactive map and return its events, building the folium map
+# with build() the first time it is drawn. st_folium renders the map to HTML
+# again on every call, so a reused map ("render" in the trace) only saves the
+# build; it keeps folium's element ids and so the HTML stable, and the map is
+# not redrawn in the browser. returned_objects limits the map events that
+# rerun the script (streamlit_folium 0.11 and later).
+def show_map(name, key, build, width=725, returned_objects=None):
+	from streamlit_folium import st_folium
+	def traced_build():
+		tracer.annotate(cache="miss")
+		return build()
+	options = {}
+	if returned_objects is not None and "returned_objects" in inspect.signature(st_folium).parameters:
+		options["returned_objects"] = returned_objects
+	with tracer.span("map", name, cache="render"):
+		m, lock = map_cache.get(key, traced_build)
+		with lock:
+			return st_folium(m, width=width, key="map-" + key, **options)
+
+# draw a map whose events are not needed as plain HTML, building and rendering
+# it only the first time; later runs reuse the rendered HTML
+def show_static_map(name, key, build, width=725, height=700):
+	import streamlit.components.v1 as components
+	def traced_render():
+		tracer.annotate(cache="miss")
+		return build().get_root().render()
+	with tracer.span("map", name, cache="hit"):
+		html, _ = map_cache.get("html-" + key, traced_render)
+		components.html(html, width=width, height=height)
+
+# a map centered on location with the Home marker and the geojson layer
+def render_map(geojson, location, zoom=16, width=725):
+	import folium
+	home = [ORIGIN["lat"], ORIGIN["lon"]]
+	def build():
+		m = folium.Map(location=location, zoom_start=zoom)
+		folium.Marker(home, popup="Home", tooltip="Home").add_to(m)
+		folium.GeoJson(geojson, name="linestring").add_to(m)
+		return m
+	show_static_map(geojson["type"], map_key(geojson, location, home, zoom, width), build, width)
+
+# current cache and pool counters, exported with the spans
+def trace_gauges():
+	gauges = {"query_cache": query_cache.stats(), "map_cache": map_cache.stats()}
+	if _pool_started.is_set():
+		gauges["pool"] = init_connection().metrics()
+	return gauges
+
+# the page span of a script run, with a trace session id kept per browser session
+def begin_run(page):
+	if "trace_session" not in st.session_state:
+		st.session_state.trace_session = uuid.uuid4().hex[:12]
+	st.session_state.prefetched = {}
+	tracer.set_context(session=st.session_state.trace_session, page=page)
+	return tracer.begin("page", page)
+
+def end_run(span):
+	tracer.end(span)
+	if TRACE.get("path") and time.time() - tracer.last_write >= TRACE.get("export_interval", 15):
+		tracer.write(TRACE["path"], trace_gauges())
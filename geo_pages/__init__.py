@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+
+import importlib
+
+# Pages of the app in sidebar order. A page module is imported the first time
+# its page is shown and provides queries(), the queries prefetched when the
+# page starts, and show(), which draws the page.
+
+PAGES = {
+	"Home": "home",
+	"5.Calculations and More Constructors": "calculations",
+	"6.Joins": "joins",
+	"7.Additional Calculations and Constructors": "polygons",
+	"** All Visuals **": "visuals",
+	"Explore": "explore",
+	"Diagnostics": "diagnostics",
+}
+
+def titles(diagnostics=False):
+	return [title for title in PAGES if diagnostics or title != "Diagnostics"]
+
+def load(title):
+	return importlib.import_module("." + PAGES[title], __name__)
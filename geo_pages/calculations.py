@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+import streamlit as st
+
+from geo_app import ORIGIN, ROUTE_QUERIES, load_route, prefetch, render_map, run_query
+from geography import map_geometry
+from sql_templates import query, render
+
+# 5. Calculations and More Constructors: the closest shops, collected into a
+# line from home
+
+def queries():
+	return (query("map_point", **ORIGIN),) + ROUTE_QUERIES
+
+def show():
+	st.markdown("## 5.Calculations and More Constructors")
+	
+	route = load_route(ORIGIN)
+	prefetch((route.multipoint_query(), route.linestring_query(), route.length_query()))
+	
+	st.markdown("Now that you have the basic understanding of how the GEOGRAPHY data type works and what a geospatial representation of data looks like in various output formats, it's time to walkthrough a scenario that requires you to run some geospatial queries to answer some questions.")
+	
+	st.markdown("> It's worth noting here that the scenario in the next three sections is more akin to what a person would do with a map application on their mobile phone, rather than how geospatial data would be used in fictional business setting. This was chosen intentionally to make this guide and these queries more relatable to the person doing the guide, rather than trying to create a realistic business scenario that is relatable to all industries, since geospatial data is used very differently across industries.")
+	
+	st.markdown("Before you begin the scenario, switch the active schema back to the shared database and make sure the output format is either GeoJSON or WKT, as you will be using another website to visualize the query results. Which output you choose will be based on your personal preference - WKT is easier for the casual person to read, while GeoJSON is arguably more common. The GeoJSON visualization tool is easier to see the points, lines, and shapes, so this guide will be showing the output for GeoJSON.")
+	
+	st.markdown("#### The Scenario")
+	
+	st.markdown("Pretend that you are currently living in your apartment near Times Square in New York City. You need to make a shopping run to Best Buy and the liquor store, as well as grab a coffee at a coffee shop. Based on your current location, what are the closest stores or shops to do these errands, and are they the most optimal locations to go to collectively? Are there other shops you could stop at along the way?")
+	
+	st.markdown("Start with running a query that represents your current location. This location has been preselected for the guide using a website that returns longitude and latitude when you click on a location on a map. Run this query:")
+	
+	sql1 = render("point", **route.params)
+	st.code(sql1, language='sql')
+	with st.expander("Expand to see the output for the above query:"):
+		# define the query
+		queryres1 = run_query(query("map_point", **ORIGIN))
+		# grab the appropriate column value into a variable
+		for row in queryres1:
+			geojson1 = map_geometry(row[0], zoom=16)
+		# render the map with a marker for the ficticious apartment and the
+		# geojson value from the query as a map layer
+		st_data1 = render_map(geojson1, [40.755702, -73.986226], zoom=16, width=725)
+		
+	st.markdown("Notice there is no `from` clause in this query, which allows you to construct a `GEOGRAPHY` object in a simple `select` statement.")
+	
+	st.markdown("> `POINT(-73.986226 40.755702)` is already a geography object in WKT format, so there was no real need to convert it again, but it was important to show the most basic way to use `TO_GEOGRAPHY` to construct a simple geography object.")
+	
+	st.markdown("In the image above, the blue map location icon represents the POINT object location. Now you know where you are!")
+	
+	st.markdown("#### Find the Closest Locations")
+	
+	st.markdown("In the next step, you are going to run queries to find the closest Best Buy, liquor store, and coffee shop to your current location from above. These queries are very similar and will do several things:")
+	
+	st.markdown("* One will query the electronics view, the other two will query the food & beverages view, applying appropriate filters to find the thing we're looking for.")
+	
+	st.markdown("* All queries will use the `ST_DWITHIN` function in the where clause to filter out stores that aren't within the stated distance. The function takes two points and a distance to determine whether those two points are less than or equal to the stated distance from each other, returning true if they are and false if they are not. In this function, you will use the coordinates column from each view to scan through all of the Best Buys, liquor stores, or coffee shops and compare them to your current location `POINT`, which you will construct using the previously used `ST_MAKEPOINT`. You will then use 1600 meters for the distance value, which is roughly equivalent to a US mile.")
+	
+	st.markdown("* Note that in the queries below, the syntax `ST_DWITHIN(...) = true` is used for readability, but the `= true` is not required for the filter to work. It is required if you were to need an `= false` condition.")
+	
+	st.markdown("* All queries will also use the `ST_DISTANCE` function, which actually gives you a value in meters representing the distance between the two points. When combined with order by and limit clauses, this will help you return only the row that is the smallest distance, or closest.")
+	
+	st.markdown("* Also note in `ST_DISTANCE` that you use the constructor `TO_GEOGRAPHY` for your current location point instead of the `ST_MAKEPOINT` constructor that you used earlier in `ST_DWITHIN`. This is to show you that that `TO_GEOGRAPHY` is a general purpose constructor where `ST_MAKEPOINT` specifically makes a `POINT` object, but in this situation they resolve to the same output. Sometimes there is more than one valid approach to construct a geospatial object.")
+	
+	st.markdown("Run the following queries (the first one has comments similar to above):")
+	
+	sql2 = render("closest_best_buy", **route.params)
+	st.code(sql2, language='sql')
+	with st.expander("Expand to see the output for the above query:"):
+		queryres2 = route.stop_rows("best_buy")
+		
+		st.dataframe(data=queryres2)
+		
+	sql3 = render("closest_liquor_store", **route.params)
+	st.code(sql3, language='sql')
+	with st.expander("Expand to see the output for the above query:"):
+		queryres3 = route.stop_rows("home_alcohol")
+		
+		st.dataframe(data=queryres3)
+	
+	sql4 = render("closest_coffee_shop", **route.params)
+	st.code(sql4, language='sql')
+	with st.expander("Expand to see the output for the above query:"):
+		queryres4 = route.stop_rows("home_coffee")		
+		st.dataframe(data=queryres4)
+		
+	st.markdown("In each case, the query returns a `POINT` object, which you aren't going to do anything with just yet, but now you have the queries that return the desired results. It would be really nice, however, if you could easily visualize how these points relate to each other.")
+	
+	st.markdown("#### Collect Points Into a Line")
+	
+	st.markdown("In the next step of this section, you're going to ‘collect' the points using `ST_COLLECT` and make a `LINESTRING` object with the `ST_MAKELINE` constructor.")
+	
+	st.markdown("* The first step in the query to is create a common table expression (CTE) query that unions together the queries you ran in the above step (keeping just the coordinates and distance_meters columns). This CTE will result in a 4 row output - 1 row for your current location, 1 row for the Best Buy location, 1 row for the liquor store, and 1 row for the coffee shop.")
+	
+	st.markdown("* You will then use `ST_COLLECT` to aggregate those 4 rows in the coordinates column into a single geospatial object, a `MULTIPOINT`. This object type is a collection of `POINT` objects that are interpreted as having no connection to each other other than they are grouped. A visualization tool will not connect these points, just plot them, so in the next step you'll turn these points into a line.")
+	
+	st.markdown("Run this query and examine the output:")
+	
+	sql5 = render("route_multipoint", **route.params)
+	st.code(sql5, language='sql')
+	with st.expander("Expand to see the output for the above query:"):
+		queryres5 = run_query(route.multipoint_query())		
+		st.dataframe(data=queryres5)
+		
+	st.markdown("The next thing you need to do is convert that `MULTIPOINT` object into a `LINESTRING` object using `ST_MAKELINE`, which takes a set of points as an input and turns them into a `LINESTRING` object. Whereas a `MULTIPOINT` has points with no assumed connection, the points in a `LINESTRING` will be interpreted as connected in the order they appear. Needing a collection of points to feed into `ST_MAKELINE` is the reason why you did the `ST_COLLECT` step above, and the only thing you need to do to the query above is wrap the `ST_COLLECT` in an `ST_LINESTRING` like so:")
+	
+	sql6 = render("route_makeline", **route.params)
+	st.code(sql6, language='sql')
+	
+	st.markdown("> You may be wondering why your current position point was added as an additional point in the line when you already included it as the first point in the `MULTIPOINT` collection above? Stay tuned for why you need this later, but logically it makes sense that you plan to go back to your New York City apartment at the end of your shopping trip.")
+	
+	st.markdown("Here is the full query for you to run (without comments):")
+	
+	sql7 = render("route_linestring", **route.params)
+	st.code(sql7, language='sql')
+	with st.expander("Expand to see the output for the above query:"):
+		queryres7 = run_query(route.linestring_query())
+		
+		for row in queryres7:
+			geojson7 = map_geometry(row[0], zoom=16)
+			
+		st_data7 = render_map(geojson7, [40.755702, -73.985144], zoom=16, width=725)
+		
+	st.markdown("Yikes! You can see in the image above that the various shops are in three different directions from your original location. That could be a long walk. Fortunately, you can find out just how long by wrapping a ST_DISTANCE function around the `LINESTRING` object, which will calculate the length of the line in meters. Run the query below:")
+	
+	sql8 = render("route_length", **route.params)
+	st.code(sql8, language='sql')
+	with st.expander("Expand to see the output for the above query:"):
+		queryres8 = run_query(route.length_query())
+		for row in queryres8:
+			metric2 = row[0]
+			
+		st.metric(label="LENGTH_METERS", value=metric2)
+		
+	st.markdown("Wow! Almost 2120 meters!")
+	
+	st.markdown("> It is correct to note that this distance represents a path based on how a bird would fly, rather than how a human would navigate the streets. The point of this exercise is not to generate walking directions, but rather to give you a feel of the various things you can parse, construct, and calculate with geospatial data and functions in Snowflake.")
+	
+	st.markdown("Now move to the next section to see how you can optimize your shopping trip.")
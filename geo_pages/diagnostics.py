@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+
+import streamlit as st
+
+from geo_app import trace_gauges, tracer
+
+# Diagnostics: the trace ring buffer and cache and pool counters
+
+def queries():
+	return ()
+
+def show():
+	st.markdown("## Diagnostics")
+	
+	st.markdown("Timings of the traced page runs, queries (with where their result came from), warehouse fetches and maps, from the ring buffer shared by all sessions of this process.")
+	
+	session = st.session_state.trace_session if st.checkbox("Only this session") else None
+	st.dataframe(data=tracer.summary(session))
+	
+	gauges = trace_gauges()
+	for column, (name, values) in zip(st.columns(len(gauges)), gauges.items()):
+		with column:
+			st.markdown("**%s**" % name)
+			st.json(values)
+	
+	with st.expander("Latest spans"):
+		st.dataframe(data=[span._asdict() for span in tracer.spans(session)[-200:]])
+	
+	st.download_button("Download OpenMetrics", tracer.openmetrics(gauges), file_name="geo_hol.prom", mime="text/plain")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+import math
+import time
+
+import streamlit as st
+
+from exploration import TileCache, explore, explore_index
+from geo_app import ORIGIN, USE_SHOP_INDEX, prefetch, run_query, secret, shop_index, show_map
+from geography import haversine
+from map_cache import map_key
+
+# Explore: click the map to move the origin and pick a search radius. Shops
+# come from cached tiles (or the shop index), so an interaction only fetches
+# the tiles a moved origin or a larger radius brings into view.
+
+# optional [geo-hol-explore] section of secrets.toml: max_points (markers
+# before shops are clustered), cluster_radius (meters from which on tiles are
+# aggregated in the warehouse, rounded down to a tile size) and min_move
+# (meters a click has to move the origin by)
+EXPLORE = secret("geo-hol-explore", {})
+
+@st.experimental_singleton
+def init_tile_cache():
+	return TileCache()
+
+def queries():
+	return ()
+
+# every missing tile is queried at once on the prefetch pool
+def fetch_tiles(queries):
+	prefetch(queries)
+	return [run_query(query) for query in queries]
+
+# the web map zoom level at which the circle fits the map
+def zoom_for(radius, lat, width=725):
+	meters_per_pixel = 2.4 * radius / width
+	return max(3, min(18, math.floor(math.log2(156543.03 * math.cos(math.radians(lat)) / meters_per_pixel))))
+
+def _feature(lon, lat, radius, label):
+	return {"type": "Feature", "geometry": {"type": "Point", "coordinates": [lon, lat]}, "properties": {"radius": radius, "label": label}}
+
+# points and clusters are the features of a single GeoJson layer, which folium
+# renders far faster than an element per marker
+def build_map(lon, lat, radius, result):
+	import folium
+	def build():
+		m = folium.Map(location=[lat, lon], zoom_start=zoom_for(radius, lat))
+		folium.Marker([lat, lon], popup="Origin", tooltip="Origin").add_to(m)
+		folium.Circle([lat, lon], radius=radius, fill=False).add_to(m)
+		features = [_feature(p_lon, p_lat, 4, "%s (%s), %d m" % (name, shop, distance)) for shop_id, p_lon, p_lat, name, shop, distance in result.points]
+		features += [_feature(c_lon, c_lat, min(25, 3 + math.sqrt(count)), "%d shops" % count) for count, c_lon, c_lat in result.clusters]
+		if features:
+			folium.GeoJson(
+				{"type": "FeatureCollection", "features": features},
+				name="shops",
+				marker=folium.CircleMarker(radius=4, fill=True),
+				style_function=lambda feature: {"radius": feature["properties"]["radius"]},
+				tooltip=folium.GeoJsonTooltip(fields=["label"], labels=False),
+			).add_to(m)
+		return m
+	return build
+
+def show():
+	st.markdown("## Explore")
+
+	st.markdown("Click anywhere on the map to move the origin, and use the slider to change the search radius. Every shop within the radius is shown; when there are too many to draw, they are grouped into clusters sized by their number of shops.")
+
+	state = st.session_state
+	home = (ORIGIN["lon"], ORIGIN["lat"])
+	if "explore_origin" not in state:
+		state.explore_origin = home
+		state.explore_click = None
+
+	radius = st.slider("Radius (meters)", 100, 10000, ORIGIN["radius"], step=100)
+	if st.button("Back to the apartment"):
+		state.explore_origin = home
+	lon, lat = state.explore_origin
+
+	started = time.perf_counter()
+	max_points = EXPLORE.get("max_points", 200)
+	if USE_SHOP_INDEX:
+		result = explore_index(shop_index(), lon, lat, radius, max_points)
+	else:
+		result = explore(lon, lat, radius, init_tile_cache(), fetch_tiles, max_points, EXPLORE.get("cluster_radius", 4000))
+	elapsed = time.perf_counter() - started
+
+	shops, shown, tiles, took = st.columns(4)
+	shops.metric("Shops", "~%d" % result.shops if result.approximate else result.shops, help="Counted by cluster, so approximate near the circle" if result.approximate else None)
+	shown.metric("Clusters" if result.clusters else "Markers", len(result.clusters) or len(result.points))
+	tiles.metric("Tiles fetched", "%d of %d" % (result.fetched, result.tiles))
+	took.metric("Lookup", "%d ms" % (elapsed * 1000))
+
+	key = map_key(lon, lat, radius, result.points, result.clusters)
+	event = show_map("explore", key, build_map(lon, lat, radius, result), returned_objects=["last_clicked"])
+
+	# the last click on the map moves the origin and reruns with the moved map;
+	# pans and zooms rerun with the same click and are ignored, and so are
+	# clicks that move the origin by less than min_move
+	click = (event or {}).get("last_clicked")
+	if click and click != state.explore_click:
+		state.explore_click = click
+		if haversine(*state.explore_origin, click["lng"], click["lat"]) >= EXPLORE.get("min_move", 10):
+			state.explore_origin = (click["lng"], click["lat"])
+			st.experimental_rerun()
+
+	if result.points:
+		with st.expander("Closest shops"):
+			st.dataframe(data=[{"id": p[0], "name": p[3], "shop": p[4], "distance_meters": round(p[5], 2)} for p in result.points[:100]])
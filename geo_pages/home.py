@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+
+import streamlit as st
+
+# Home: where to go from here
+
+def queries():
+	return ()
+
+def show():
+	st.markdown("## Home")
+	st.markdown("Select a radio button on the sidebar to jump to a quickstart page (only pages 5-7 are represented here) or to jump to the page that allows you to easily see all of the map visuals used in pages 5-7).")
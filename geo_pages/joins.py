@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+import streamlit as st
+
+from geo_app import ORIGIN, ROUTE_QUERIES, load_route, prefetch, render_map, run_query
+from geography import map_geometry
+from sql_templates import render
+
+# 6. Joins: shops closer to the Best Buy, and the optimized route
+
+def queries():
+	return ROUTE_QUERIES
+
+def show():
+	st.markdown("## 6.Joins")
+	
+	route = load_route(ORIGIN)
+	prefetch((route.linestring_query(optimized=True), route.length_query(optimized=True)))
+	
+	st.markdown("In the previous section, all of your queries to find the closest Best Buy, liquor store, and coffee shop were based on proximity to your Times Square apartment. But wouldn't it make more sense to see, for example, if there was a liquor store and/or coffee shop closer to Best Buy? You can use geospatial functions in a table join to find out.")
+	
+	st.markdown("#### Is There Anything Closer to Best Buy?")
+	
+	st.markdown("You have been using two views in your queries so far: `v_osm_ny_shop_electronics`, where stores like Best Buy are catalogued, and `v_osm_ny_shop_food_beverage`, where liquor stores and coffee shops are catalogued. To find the latter near the former, you'll join these two tables. The new queries introduce a few changes:")
+	
+	st.markdown("* The electronics view will serve as the primary view in the query, where you'll put a filter on the known Best Buy store using its id value from the view.")
+	
+	st.markdown("* Instead of the `JOIN` clause using a common `a.key = b.key` foreign key condition, the `ST_DWITHIN` function will serve as the join condition (remember before the note about not needing to include the `= true` part).")
+	
+	st.markdown("* The `ST_DISTANCE` calculation is now using the Best Buy coordinate and all of the other coordinates in the food & beverage view to determine the closest liquor store and coffee shop location to Best Buy.")
+	
+	st.markdown("Run the two queries below (only the first is commented):")
+	
+	sql1 = render("join_liquor_store", **route.params)
+	st.code(sql1, language='sql')
+	with st.expander("Expand to see the output for the above query:"):
+		queryres1 = route.stop_rows("best_buy_alcohol")
+		
+		st.dataframe(data=queryres1)
+		
+	sql2 = render("join_coffee_shop", **route.params)
+	st.code(sql2, language='sql')
+	with st.expander("Expand to see the output for the above query:"):
+		queryres2 = route.stop_rows("best_buy_coffee")
+		
+		st.dataframe(data=queryres2)
+		
+	st.markdown("If you note in the result of each query, the first query found a different liquor store closer to Best Buy, whereas the second query returned the same coffee shop from your original search, so you've optimized as much as you can.")
+	
+	st.markdown("> The id of the selected Best Buy was hard coded into the above queries to keep them easier to read and to keep you focused on the join clause of these queries, rather than introducing sub queries to dynamically calculate the nearest Best Buy. Those sub queries would have created longer queries that were harder to read.")
+	
+	st.markdown("If you're feeling adventurous, go read about other possible relationship functions that could be used in the join for this scenario [here](https://docs.snowflake.com/en/sql-reference/functions-geospatial.html).")
+	
+	st.markdown("#### Calculate a New Linestring")
+	
+	st.markdown("Now that you know that there is a better option for the liquor store, substitute the above liquor store query into the original linestring query to produce a different object. For visualization sake, the order of the statements in the unions have been changed, which affects the order of the points in the object.")
+	
+	sql3 = render("optimized_linestring", **route.params)
+	st.code(sql3, language='sql')
+	with st.expander("Expand to see the output for the above query:"):
+		queryres3 = run_query(route.linestring_query(optimized=True))
+		
+		for row in queryres3:
+			geojson3 = map_geometry(row[0], zoom=16)
+			
+		st_data3 = render_map(geojson3, [40.755702, -73.984144], zoom=16, width=725)
+		
+	st.markdown("Much better! This looks like a more efficient shopping path. Check the new distance by running this query:")
+	
+	sql4 = render("optimized_length", **route.params)
+	st.code(sql4, language='sql')
+	with st.expander("Expand to see the output for the above query:"):
+		queryres4 = run_query(route.length_query(optimized=True))
+		for row in queryres4:
+			metric4 = row[0]
+			
+		st.metric(label="LENGTH_METERS", value=metric4)
+		
+	st.markdown("Nice! 1537 meters, which is a savings of about 583 meters, or a third of a mile. By joining the two shop views together, you were able to find an object in one table that is closest to an object from another table to optimize your route. Now that you have a more optimized route, can you stop at any other shops along the way? Advance to the next section to find out.")
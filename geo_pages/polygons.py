@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+import streamlit as st
+
+from geo_app import FETCH_ARROW, ORIGIN, ROUTE_QUERIES, load_route, prefetch, render_map, run_query
+from geography import map_geometry
+from sql_templates import render
+
+# 7. Additional Calculations and Constructors: the route as a polygon and the
+# shops inside it
+
+def queries():
+	return ROUTE_QUERIES
+
+def show():
+	st.markdown("## 7.Additional Calculations and Constructors")
+	
+	route = load_route(ORIGIN)
+	prefetch((route.polygon_query(), route.perimeter_query(), route.polygon_with_points_query()))
+	prefetch((route.shops_in_polygon_query(),), columnar=FETCH_ARROW)
+	
+	st.markdown("The `LINESTRING` object that was created in the previous section looks like a nice, clean, four-sided polygon. As it turns out, a `POLYGON` is another geospatial object type that you can construct and work with. Where you can think of a `LINESTRING` as a border of a shape, a `POLYGON` is the filled version of the shape itself. The key thing about a `POLYGON` is that it must end at its beginning, where a `LINESTRING` does not need to return to the starting point.")
+	
+	st.markdown(">Remember in a previous section when you added your Times Square Apartment location to both the beginning and the end of the `LINESTRING`? In addition to the logical explanation of returning home after your shopping trip, that point was duplicated at the beginning and end so you can construct a `POLYGON` in this section!")
+	
+	st.markdown("#### Construct a Polygon")
+	
+	st.markdown("Constructing a `POLYGON` is done with the `ST_MAKEPOLYGON` function, just like the `ST_MAKELINE`. The only difference is where `ST_MAKELINE` makes a line out of points, `ST_MAKEPOLYGON` makes a polygon out of lines. Therefore, the only thing you need to do to the previous query that constructed the line is to wrap that construction with `ST_MAKEPOLYGON` like this:")
+	
+	sql1 = render("route_makepolygon", **route.params)
+	st.code(sql1, language='sql')
+	
+	st.markdown("This really helps illustrate the construction progression: from individual points, to a collection of points, to a line, to a polygon. Run this query to create your polygon:")
+	
+	sql2 = render("route_polygon", **route.params)
+	st.code(sql2, language='sql')
+	with st.expander("Expand to see the output for the above query:"):
+		queryres1 = run_query(route.polygon_query())
+		
+		for row in queryres1:
+			geojson1 = map_geometry(row[0], zoom=16)
+			
+		st_data1 = render_map(geojson1, [40.755702, -73.984144], zoom=16, width=725)
+	
+	st.markdown("And just like before where you could calculate the distance of a `LINESTRING` using `ST_DISTANCE`, you can calculate the perimeter of a `POLYGON` using `ST_PERIMETER`, which you wrap around the polygon construction in the same way you wrapped around the line construction. Run this query to calculate the perimeter:")
+
+	sql3 = render("route_perimeter", **route.params)
+	st.code(sql3, language='sql')
+	with st.expander("Expand to see the output for the above query:"):
+		queryres2 = run_query(route.perimeter_query())
+		for row in queryres2:
+			metric1 = row[0]
+			
+		st.metric(label="PERIMETER_METERS", value=metric1)
+		
+	st.markdown("Nice! That query returned the same `1537` meters you got before as the distance of the `LINESTRING`, which makes sense, because the perimeter of a `POLYGON` is the same distance as a `LINESTRING` that constructs a POLYGON.")
+	
+	st.markdown("#### Find Shops Inside The Polygon")
+	
+	st.markdown("The final activity you will do in this guide is to find any type of shop within the `v_osm_ny_shop` view that exists inside of the `POLYGON` you just created in the previous step. This will reveal to you all of the stores you can stop at along your path to your core stops. To accomplish this, here is what you will do to the query that builds the `POLYGON`:")
+	
+	st.markdown("* The `POLYGON` is a result set in its own right, so you are going to wrap this query in another CTE. This will allow you to refer back to the polygon as a singular entity more cleanly in a join. You will call this CTE the `search_area`.")
+	st.markdown("* Then you will join the `v_osm_ny_shop` to the `search area` CTE using the `ST_WITHIN` function, which is different than `ST_DWITHIN`. The `ST_WITHIN` function takes one geospatial object and determines if it is completely inside another geospatial object, returning `true` if it is and `false` if it isn't. In the query, it will determine if any row in `v_osm_ny_shop` is completely inside the `search_area` CTE.")
+	
+	st.markdown("Run this query to see what shops are inside the polygon:")
+	
+	sql4 = render("route_shops_in_polygon", **route.params)
+	st.code(sql4, language='sql')
+	with st.expander("Expand to see the output for the above query:"):
+		queryres3 = run_query(route.shops_in_polygon_query(), columnar=FETCH_ARROW)
+		
+		st.dataframe(data=queryres3)
+	
+	st.markdown("And your final step will be to construct a single geospatial object that includes both the `POLYGON` you created as well as a `POINT` for every shop inside the `POLYGON`. This single object is known as a `GEOMETRYCOLLECTION`, which a geospatial type that can hold any combination of geospatial objects as one grouping. To create this object, you will do the following:")
+	
+	st.markdown("* Create a CTE that unions the `POLYGON` query with the above query that finds shops inside the polygon, keeping only the necessary coordinates column in the latter query for simplicity. This CTE will produce 1 row for the `POLYGON` and rows for each individual shop `POINT` inside the `POLYGON`.")
+	
+	st.markdown("* Use `ST_COLLECT` to aggregate the rows above (1 `POLYGON`, all the `POINTS`) into a single `GEOMETRYCOLLECTION`.")
+	
+	st.markdown("Run the query below:")
+	
+	sql5 = render("route_polygon_with_points", **route.params)
+	st.code(sql5, language='sql')
+	with st.expander("Expand to see the output for the above query:"):
+		queryres4 = run_query(route.polygon_with_points_query())
+		
+		for row in queryres4:
+			geojson2 = map_geometry(row[0], zoom=16)
+			
+		st_data2 = render_map(geojson2, [40.755702, -73.984144], zoom=16, width=725)
+		
+	st.markdown("> You may feel that these last few queries were a bit long and repetitive, but remember that the intention of this guide was to walk you through the progression of building these longer, more complicated queries by illustrating to you what happens at each step through the progression. By understanding how functions can be combined, it helps you to understand how you can do more advanced things with Snowflake geospatial features!")
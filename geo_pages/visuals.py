@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+import streamlit as st
+
+from geo_app import ORIGIN, ROUTE_QUERIES, load_route, render_map, run_query
+from geography import map_geometry
+from sql_templates import query
+
+# ** All Visuals **: every map of pages 5-7 behind one selectbox
+
+def queries():
+	return (query("map_point", **ORIGIN),) + ROUTE_QUERIES
+
+def show():
+	st.markdown("## ** All Visuals **")
+	
+	st.markdown("Use the dropdown below to select one of the map visuals from the quickstart. The visuals are organized as follows:")
+	
+	st.markdown("* `Point`: visualizing starting point from page 5")
+	st.markdown("* `Unoptimized Linestring`: visualizing the route between the 4 points from page 5")
+	st.markdown("* `Optimized Linestring`: visualizing the new route from page 6")
+	st.markdown("* `Polygon`: visualizing the polygon constructed in page 7")
+	st.markdown("* `Polygon with Points`: visualizing the polygon and the shop points from page 7")
+	
+	selection = st.selectbox("",('Point','Unoptimized Linestring','Optimized Linestring','Polygon','Polygon with Points'))
+	
+	route = load_route(ORIGIN)
+	
+	if selection == "Point":
+		queryres1 = run_query(query("map_point", **ORIGIN))
+		
+		for row in queryres1:
+			geojson1 = map_geometry(row[0], zoom=16)
+			
+		st_data1 = render_map(geojson1, [40.755702, -73.986226], zoom=16, width=725)
+		
+	elif selection == "Unoptimized Linestring":
+		queryres2 = run_query(route.linestring_query())
+		
+		for row in queryres2:
+			geojson2 = map_geometry(row[0], zoom=16)
+			
+		st_data2 = render_map(geojson2, [40.755702, -73.985144], zoom=16, width=725)
+		
+	elif selection == "Optimized Linestring":
+		queryres3 = run_query(route.linestring_query(optimized=True))
+		
+		for row in queryres3:
+			geojson3 = map_geometry(row[0], zoom=16)
+			
+		st_data3 = render_map(geojson3, [40.755702, -73.984144], zoom=16, width=725)
+		
+	elif selection == "Polygon":
+		queryres4 = run_query(route.polygon_query())
+		
+		for row in queryres4:
+			geojson4 = map_geometry(row[0], zoom=16)
+			
+		st_data4 = render_map(geojson4, [40.755702, -73.984144], zoom=16, width=725)	
+	
+	elif selection == "Polygon with Points":
+		queryres5 = run_query(route.polygon_with_points_query())
+		
+		for row in queryres5:
+			geojson5 = map_geometry(row[0], zoom=16)
+			
+		st_data5 = render_map(geojson5, [40.755702, -73.984144], zoom=16, width=725)
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+
+import json
+import math
+import re
+import struct
+from functools import lru_cache
+
+# Minimal GEOGRAPHY model shared by the local backend and the in-process tools.
+# Geometries are GeoJSON dicts with [lon, lat] positions; distances are
+# great-circle distances on a sphere with the mean earth radius, which matches
+# the warehouse to well under a meter at city scale.
+
+EARTH_RADIUS = 6371008.8
+
+_WKT_TOKEN = re.compile(r"\s*([A-Za-z]+|\(|\)|,|[-+0-9.eE]+)")
+
+_WKT_TYPES = {
+	"POINT": "Point",
+	"MULTIPOINT": "MultiPoint",
+	"LINESTRING": "LineString",
+	"MULTILINESTRING": "MultiLineString",
+	"POLYGON": "Polygon",
+	"MULTIPOLYGON": "MultiPolygon",
+	"GEOMETRYCOLLECTION": "GeometryCollection",
+}
+
+def haversine(lon1, lat1, lon2, lat2):
+	lon1, lat1, lon2, lat2 = map(math.radians, (lon1, lat1, lon2, lat2))
+	a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+	return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+# Parsing and formatting
+
+def _parse_coordinates(tokens, i):
+	items = []
+	i += 1
+	while True:
+		if tokens[i] == "(":
+			item, i = _parse_coordinates(tokens, i)
+		else:
+			item = []
+			while tokens[i] not in (",", ")"):
+				item.append(float(tokens[i]))
+				i += 1
+			item = item[:2]
+		items.append(item)
+		i += 1
+		if tokens[i - 1] == ")":
+			return items, i
+
+def _parse_wkt(tokens, i):
+	kind = _WKT_TYPES[tokens[i].upper()]
+	i += 1
+	if kind == "GeometryCollection":
+		geometries = []
+		i += 1
+		while True:
+			geometry, i = _parse_wkt(tokens, i)
+			geometries.append(geometry)
+			i += 1
+			if tokens[i - 1] == ")":
+				return {"type": kind, "geometries": geometries}, i
+	coordinates, i = _parse_coordinates(tokens, i)
+	if kind == "Point":
+		coordinates = coordinates[0]
+	elif kind == "MultiPoint":
+		coordinates = [c[0] if isinstance(c[0], list) else c for c in coordinates]
+	return {"type": kind, "coordinates": coordinates}, i
+
+def parse_wkt(text):
+	return _parse_wkt(_WKT_TOKEN.findall(text), 0)[0]
+
+# GeoJSON or WKT text, as accepted by TO_GEOGRAPHY
+def parse(text):
+	if text.lstrip().startswith("{"):
+		return json.loads(text)
+	return parse_wkt(text)
+
+def dumps(geometry):
+	return json.dumps(geometry, separators=(",", ":"))
+
+def _wkt_coordinates(coordinates):
+	if coordinates and isinstance(coordinates[0], list):
+		return "(%s)" % ", ".join(_wkt_coordinates(c) for c in coordinates)
+	return "%r %r" % tuple(coordinates)
+
+def to_wkt(geometry):
+	name = {v: k for k, v in _WKT_TYPES.items()}[geometry["type"]]
+	if geometry["type"] == "GeometryCollection":
+		return "%s(%s)" % (name, ", ".join(to_wkt(g) for g in geometry["geometries"]))
+	if geometry["type"] == "Point":
+		return "POINT(%s)" % _wkt_coordinates(geometry["coordinates"])
+	return name + _wkt_coordinates(geometry["coordinates"])
+
+# WKB, as returned by ST_ASWKB; EWKB (with an SRID) and big-endian input is accepted
+
+_WKB_TYPES = {1: "Point", 2: "LineString", 3: "Polygon", 4: "MultiPoint", 5: "MultiLineString", 6: "MultiPolygon", 7: "GeometryCollection"}
+_WKB_CODES = {v: k for k, v in _WKB_TYPES.items()}
+
+def _read_wkb(data, offset):
+	order = "<" if data[offset] == 1 else ">"
+	code, = struct.unpack_from(order + "I", data, offset + 1)
+	offset += 5
+	if code & 0x20000000:
+		offset += 4
+	# Z and M ordinates (EWKB flags or ISO 1000/2000/3000 codes) are skipped
+	base = code & 0x1fffffff
+	dims = 2 + bool(code & 0x80000000) + bool(code & 0x40000000) + (0, 1, 1, 2)[base // 1000]
+	kind = _WKB_TYPES[base % 1000]
+	def positions(offset):
+		n, = struct.unpack_from(order + "I", data, offset)
+		offset += 4
+		values = struct.unpack_from(order + "%dd" % (n * dims), data, offset)
+		return [list(values[i:i + 2]) for i in range(0, n * dims, dims)], offset + 8 * n * dims
+	if kind == "Point":
+		return {"type": kind, "coordinates": list(struct.unpack_from(order + "2d", data, offset))}, offset + 8 * dims
+	if kind == "LineString":
+		coordinates, offset = positions(offset)
+		return {"type": kind, "coordinates": coordinates}, offset
+	n, = struct.unpack_from(order + "I", data, offset)
+	offset += 4
+	parts = []
+	for _ in range(n):
+		if kind == "Polygon":
+			part, offset = positions(offset)
+		else:
+			part, offset = _read_wkb(data, offset)
+		parts.append(part)
+	if kind == "Polygon":
+		return {"type": kind, "coordinates": parts}, offset
+	if kind == "GeometryCollection":
+		return {"type": kind, "geometries": parts}, offset
+	return {"type": kind, "coordinates": [part["coordinates"] for part in parts]}, offset
+
+def from_wkb(data):
+	return _read_wkb(bytes(data), 0)[0]
+
+def _write_positions(path):
+	return struct.pack("<I", len(path)) + b"".join(struct.pack("<2d", *p[:2]) for p in path)
+
+def to_wkb(geometry):
+	kind = geometry["type"]
+	header = struct.pack("<BI", 1, _WKB_CODES[kind])
+	if kind == "Point":
+		return header + struct.pack("<2d", *geometry["coordinates"][:2])
+	if kind == "LineString":
+		return header + _write_positions(geometry["coordinates"])
+	if kind == "Polygon":
+		return header + struct.pack("<I", len(geometry["coordinates"])) + b"".join(_write_positions(ring) for ring in geometry["coordinates"])
+	if kind == "GeometryCollection":
+		parts = geometry["geometries"]
+	else:
+		part_type = {"MultiPoint": "Point", "MultiLineString": "LineString", "MultiPolygon": "Polygon"}[kind]
+		parts = [{"type": part_type, "coordinates": c} for c in geometry["coordinates"]]
+	return header + struct.pack("<I", len(parts)) + b"".join(to_wkb(part) for part in parts)
+
+# Map layers
+
+# round positions to what is visible at a web map zoom level (a fraction of a
+# 256 px tile) and drop the repeated positions that rounding creates
+def round_for_zoom(geometry, zoom):
+	digits = max(0, math.ceil(math.log10(256 * 2 ** zoom / 360)))
+	def path(coordinates, minimum):
+		rounded = []
+		for p in coordinates:
+			p = [round(p[0], digits), round(p[1], digits)]
+			if not rounded or p != rounded[-1]:
+				rounded.append(p)
+		return rounded if len(rounded) >= minimum else [[round(c, digits) for c in p[:2]] for p in coordinates]
+	kind = geometry["type"]
+	if kind == "GeometryCollection":
+		return {"type": kind, "geometries": [round_for_zoom(g, zoom) for g in geometry["geometries"]]}
+	if kind == "Point":
+		return {"type": kind, "coordinates": [round(c, digits) for c in geometry["coordinates"][:2]]}
+	if kind == "MultiPoint":
+		return {"type": kind, "coordinates": [[round(c, digits) for c in p[:2]] for p in geometry["coordinates"]]}
+	if kind == "LineString":
+		return {"type": kind, "coordinates": path(geometry["coordinates"], 2)}
+	if kind in ("Polygon", "MultiLineString"):
+		return {"type": kind, "coordinates": [path(part, 4 if kind == "Polygon" else 2) for part in geometry["coordinates"]]}
+	return {"type": kind, "coordinates": [[path(ring, 4) for ring in polygon] for polygon in geometry["coordinates"]]}
+
+# a GeoJSON-ready geometry for a map layer, decoded from WKB once per process
+# and zoom level; callers must not modify the result
+@lru_cache(maxsize=256)
+def _map_geometry(wkb, zoom):
+	geometry = from_wkb(wkb)
+	return geometry if zoom is None else round_for_zoom(geometry, zoom)
+
+def map_geometry(wkb, zoom=None):
+	return _map_geometry(bytes(wkb), zoom)
+
+# Constructors
+
+def point(lon, lat):
+	return {"type": "Point", "coordinates": [lon, lat]}
+
+# every position of a geometry, in order
+def positions(geometry):
+	kind = geometry["type"]
+	if kind == "Point":
+		return [geometry["coordinates"]]
+	if kind in ("MultiPoint", "LineString"):
+		return list(geometry["coordinates"])
+	if kind in ("MultiLineString", "Polygon"):
+		return [p for part in geometry["coordinates"] for p in part]
+	if kind == "MultiPolygon":
+		return [p for polygon in geometry["coordinates"] for ring in polygon for p in ring]
+	return [p for g in geometry["geometries"] for p in positions(g)]
+
+def collect(geometries):
+	if all(g["type"] == "Point" for g in geometries):
+		return {"type": "MultiPoint", "coordinates": [g["coordinates"] for g in geometries]}
+	return {"type": "GeometryCollection", "geometries": list(geometries)}
+
+def makeline(*geometries):
+	return {"type": "LineString", "coordinates": [p for g in geometries for p in positions(g)]}
+
+def makepolygon(line):
+	ring = list(line["coordinates"])
+	if ring[0] != ring[-1]:
+		ring.append(ring[0])
+	return {"type": "Polygon", "coordinates": [ring]}
+
+# Measurements
+
+def distance(a, b):
+	if a["type"] != "Point" or b["type"] != "Point":
+		raise ValueError("only the distance between two points is supported, not %s and %s" % (a["type"], b["type"]))
+	return haversine(*a["coordinates"], *b["coordinates"])
+
+def _path_length(path):
+	return sum(haversine(*path[i], *path[i + 1]) for i in range(len(path) - 1))
+
+def length(geometry):
+	if geometry["type"] == "LineString":
+		return _path_length(geometry["coordinates"])
+	if geometry["type"] == "MultiLineString":
+		return sum(_path_length(line) for line in geometry["coordinates"])
+	return 0.0
+
+def perimeter(geometry):
+	if geometry["type"] == "Polygon":
+		return sum(_path_length(ring) for ring in geometry["coordinates"])
+	if geometry["type"] == "MultiPolygon":
+		return sum(_path_length(ring) for polygon in geometry["coordinates"] for ring in polygon)
+	return 0.0
+
+# even-odd ray casting in lon/lat, which is accurate for city-sized polygons
+def _in_ring(lon, lat, ring):
+	inside = False
+	for i in range(len(ring) - 1):
+		(x1, y1), (x2, y2) = ring[i][:2], ring[i + 1][:2]
+		if (y1 > lat) != (y2 > lat) and lon < x1 + (lat - y1) * (x2 - x1) / (y2 - y1):
+			inside = not inside
+	return inside
+
+# positions closer than this (in degrees, about 0.1 mm) to an edge are on it
+BOUNDARY_DEGREES = 1e-9
+
+# whether lon/lat lies on an edge of the ring, from its distance to each segment
+def _on_ring(lon, lat, ring, tolerance=BOUNDARY_DEGREES):
+	for i in range(len(ring) - 1):
+		(x1, y1), (x2, y2) = ring[i][:2], ring[i + 1][:2]
+		dx, dy = x2 - x1, y2 - y1
+		length2 = dx * dx + dy * dy
+		t = max(0.0, min(1.0, ((lon - x1) * dx + (lat - y1) * dy) / length2)) if length2 else 0.0
+		if math.hypot(lon - x1 - t * dx, lat - y1 - t * dy) <= tolerance:
+			return True
+	return False
+
+# as ST_WITHIN, positions on the boundary (of the exterior or of a hole) are
+# not inside; ray casting alone is arbitrary there, and route stops are vertices
+def polygon_contains(rings, lon, lat):
+	if any(_on_ring(lon, lat, ring) for ring in rings):
+		return False
+	return _in_ring(lon, lat, rings[0]) and not any(_in_ring(lon, lat, hole) for hole in rings[1:])
+
+def within(a, b):
+	if b["type"] == "Polygon":
+		polygons = [b["coordinates"]]
+	elif b["type"] == "MultiPolygon":
+		polygons = b["coordinates"]
+	else:
+		return False
+	return all(any(polygon_contains(rings, lon, lat) for rings in polygons) for lon, lat in positions(a))
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+
+import argparse
+import hashlib
+import math
+import os
+import random
+import re
+import sqlite3
+from functools import lru_cache
+
+import geography
+
+# Local stand-in for the warehouse, used for tests, benchmarks and offline
+# serving. It runs the app's queries with SQLite over an extract of the OSM NY
+# shop views, with the geography functions they use registered as Python
+# functions. Geographies are stored and returned as GeoJSON text, the
+# warehouse's default output format, or as WKB through ST_ASWKB, so pages
+# render the same either way.
+#
+# Create the extract once from a Snowflake account with
+#   python local_backend.py export data/osm_ny_shops.sqlite
+# and select it in secrets.toml with geo-hol-backend = "local" (or the
+# GEO_HOL_BACKEND environment variable) and an optional [geo-hol-local] path.
+# Without an account, a synthetic extract of the same shape for tests and CI
+# is created with
+#   python local_backend.py generate data/osm_ny_shops.sqlite --shops 2000 --seed 0
+
+DEFAULT_EXTRACT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "osm_ny_shops.sqlite")
+
+VIEWS = ("v_osm_ny_shop", "v_osm_ny_shop_electronics", "v_osm_ny_shop_food_beverages")
+
+# the connector's numeric paramstyle (:1) in SQLite's spelling (?1)
+_NUMERIC = re.compile(r"(?<![:\w]):(\d+)")
+
+@lru_cache(maxsize=65536)
+def _geo(text):
+	return geography.parse(text)
+
+def _geography_function(fn):
+	def wrapper(*args):
+		if any(arg is None for arg in args):
+			return None
+		return fn(*args)
+	return wrapper
+
+class _Collect:
+	def __init__(self):
+		self.geometries = []
+
+	def step(self, value):
+		if value is not None:
+			self.geometries.append(_geo(value))
+
+	def finalize(self):
+		return geography.dumps(geography.collect(self.geometries)) if self.geometries else None
+
+# HASH_AGG: a signed 64-bit hash of all rows that does not depend on their
+# order (not the warehouse's values, only its behavior)
+class _HashAgg:
+	def __init__(self):
+		self.total = 0
+
+	def step(self, *values):
+		digest = hashlib.blake2b(repr(values).encode("utf-8"), digest_size=8).digest()
+		self.total = (self.total + int.from_bytes(digest, "little")) % 2 ** 64
+
+	def finalize(self):
+		return self.total - 2 ** 64 if self.total >= 2 ** 63 else self.total
+
+FUNCTIONS = {
+	"to_geography": (1, lambda text: geography.dumps(_geo(text))),
+	"st_makepoint": (2, lambda lon, lat: geography.dumps(geography.point(lon, lat))),
+	"st_x": (1, lambda g: _geo(g)["coordinates"][0]),
+	"st_y": (1, lambda g: _geo(g)["coordinates"][1]),
+	"st_distance": (2, lambda a, b: geography.distance(_geo(a), _geo(b))),
+	"st_dwithin": (3, lambda a, b, d: geography.distance(_geo(a), _geo(b)) <= d),
+	"st_makeline": (2, lambda a, b: geography.dumps(geography.makeline(_geo(a), _geo(b)))),
+	"st_makepolygon": (1, lambda line: geography.dumps(geography.makepolygon(_geo(line)))),
+	"st_within": (2, lambda a, b: geography.within(_geo(a), _geo(b))),
+	"st_length": (1, lambda g: geography.length(_geo(g))),
+	"st_perimeter": (1, lambda g: geography.perimeter(_geo(g))),
+	"st_aswkt": (1, lambda g: geography.to_wkt(_geo(g))),
+	"st_aswkb": (1, lambda g: geography.to_wkb(_geo(g))),
+	# not built into every SQLite
+	"floor": (1, math.floor),
+}
+
+def register_functions(db):
+	for name, (nargs, fn) in FUNCTIONS.items():
+		db.create_function(name, nargs, _geography_function(fn), deterministic=True)
+	db.create_aggregate("st_collect", 1, _Collect)
+	db.create_aggregate("hash_agg", -1, _HashAgg)
+
+# DB-API shaped like the connector's, so the pool and run_query need no changes
+class LocalCursor:
+	def __init__(self, db):
+		self._cursor = db.cursor()
+		self.sfqid = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+	@property
+	def description(self):
+		return self._cursor.description
+
+	@property
+	def rowcount(self):
+		return self._cursor.rowcount
+
+	def execute(self, sql, params=()):
+		self._cursor.execute(_NUMERIC.sub(r"?\1", sql), list(params or ()))
+		return self
+
+	def fetchone(self):
+		return self._cursor.fetchone()
+
+	def fetchmany(self, size=1000):
+		return self._cursor.fetchmany(size)
+
+	def fetchall(self):
+		return self._cursor.fetchall()
+
+	# the connector's Arrow result batches (needs pyarrow)
+	def fetch_arrow_batches(self, batch_size=10000):
+		import pyarrow as pa
+		names = [column[0] for column in self._cursor.description]
+		for rows in iter(lambda: self._cursor.fetchmany(batch_size), []):
+			yield pa.RecordBatch.from_arrays([pa.array(column) for column in zip(*rows)], names=names)
+
+	def fetch_arrow_all(self):
+		import pyarrow as pa
+		batches = list(self.fetch_arrow_batches())
+		return pa.Table.from_batches(batches) if batches else None
+
+	def close(self):
+		self._cursor.close()
+
+class LocalConnection:
+	def __init__(self, path):
+		self._db = sqlite3.connect("file:%s?mode=ro" % path, uri=True, check_same_thread=False)
+		register_functions(self._db)
+		self._closed = False
+
+	def cursor(self):
+		return LocalCursor(self._db)
+
+	def is_closed(self):
+		return self._closed
+
+	def close(self):
+		self._closed = True
+		self._db.close()
+
+def connect(path=DEFAULT_EXTRACT):
+	if not os.path.exists(path):
+		raise FileNotFoundError("no local extract at %s, create it with: python local_backend.py export %s" % (path, path))
+	return LocalConnection(path)
+
+def _open_extract(path):
+	os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+	return sqlite3.connect(path)
+
+def _create_view(db, view):
+	db.execute("drop table if exists %s" % view)
+	db.execute("create table %s (id integer primary key, coordinates text, name text, shop text, addr_housenumber text, addr_street text)" % view)
+
+def _close_extract(db):
+	for view in VIEWS:
+		db.execute("create index %s_shop on %s (shop)" % (view, view))
+	db.commit()
+	db.close()
+
+# copy the shop views from the warehouse into a SQLite extract
+def export_extract(conn, path, batch_size=10000):
+	db = _open_extract(path)
+	for view in VIEWS:
+		_create_view(db, view)
+		with conn.cursor() as cur:
+			cur.execute("select id, st_aswkt(coordinates), name, shop, addr_housenumber, addr_street from %s" % view)
+			for rows in iter(lambda: cur.fetchmany(batch_size), []):
+				db.executemany("insert into %s values (?, ?, ?, ?, ?, ?)" % view, [(row[0], geography.dumps(geography.parse_wkt(row[1]))) + tuple(row[2:]) for row in rows])
+	_close_extract(db)
+
+# shop types of the synthetic extract, and the views they belong to
+ELECTRONICS_SHOPS = ("electronics", "computer", "mobile_phone")
+FOOD_BEVERAGES_SHOPS = ("alcohol", "coffee", "bakery", "beverages")
+OTHER_SHOPS = ("clothes", "convenience", "books", "hairdresser", "florist")
+_STREETS = ("Broadway", "5th Avenue", "7th Avenue", "West 42nd Street", "West 34th Street", "Lexington Avenue")
+
+# a synthetic extract with the same tables as an exported one: shops spread
+# uniformly over a box of span degrees around the Home address, the same for
+# the same seed, with a share of the electronics stores named Best Buy
+def generate_extract(path, shops=2000, seed=0, span=0.03):
+	from sql_templates import HOME
+	rng = random.Random(seed)
+	rows = {view: [] for view in VIEWS}
+	for n in range(1, shops + 1):
+		shop = rng.choice(ELECTRONICS_SHOPS + FOOD_BEVERAGES_SHOPS + OTHER_SHOPS)
+		lon = round(HOME[0] + rng.uniform(-span, span), 7)
+		lat = round(HOME[1] + rng.uniform(-span, span), 7)
+		name = "Best Buy" if shop == "electronics" and rng.random() < 0.3 else "%s %d" % (shop.replace("_", " ").title(), n)
+		row = (n, geography.dumps(geography.point(lon, lat)), name, shop, str(rng.randint(1, 999)), rng.choice(_STREETS))
+		rows["v_osm_ny_shop"].append(row)
+		if shop in ELECTRONICS_SHOPS:
+			rows["v_osm_ny_shop_electronics"].append(row)
+		elif shop in FOOD_BEVERAGES_SHOPS:
+			rows["v_osm_ny_shop_food_beverages"].append(row)
+	db = _open_extract(path)
+	for view in VIEWS:
+		_create_view(db, view)
+		db.executemany("insert into %s values (?, ?, ?, ?, ?, ?)" % view, rows[view])
+	_close_extract(db)
+
+def load_secrets():
+	import tomllib
+	for path in (os.path.join(".streamlit", "secrets.toml"), os.path.expanduser(os.path.join("~", ".streamlit", "secrets.toml"))):
+		if os.path.exists(path):
+			with open(path, "rb") as f:
+				return tomllib.load(f)
+	raise FileNotFoundError("no .streamlit/secrets.toml found")
+
+# a connection for the command line tools, to the local extract or to the
+# Snowflake account of secrets.toml
+def connect_backend(backend, extract=None):
+	if backend == "local":
+		return connect(extract or DEFAULT_EXTRACT)
+	import snowflake.connector
+	return snowflake.connector.connect(**dict(load_secrets()["geo-hol"], paramstyle="numeric"))
+
+def main():
+	parser = argparse.ArgumentParser(description="Manage the local extract of the OSM NY shop views")
+	subparsers = parser.add_subparsers(dest="command", required=True)
+	export = subparsers.add_parser("export", help="copy the shop views from Snowflake into a SQLite extract")
+	export.add_argument("path", nargs="?", default=DEFAULT_EXTRACT)
+	generate = subparsers.add_parser("generate", help="create a synthetic extract for tests and CI")
+	generate.add_argument("path", nargs="?", default=DEFAULT_EXTRACT)
+	generate.add_argument("--shops", type=int, default=2000)
+	generate.add_argument("--seed", type=int, default=0)
+	args = parser.parse_args()
+	if args.command == "generate":
+		generate_extract(args.path, args.shops, args.seed)
+	elif args.command == "export":
+		import snowflake.connector
+		conn = snowflake.connector.connect(**load_secrets()["geo-hol"])
+		try:
+			export_extract(conn, args.path)
+		finally:
+			conn.close()
+
+if __name__ == "__main__":
+	main()
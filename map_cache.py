@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+# Process-wide cache of built folium maps, or of their rendered HTML.
+# A map is identified by the content of its layers, its center, zoom and size.
+# Reusing rendered HTML skips both building the map and serializing it, which
+# is most of the cost. A reused Map object only skips the build, since
+# st_folium renders it again on every call, but it keeps folium's generated
+# element ids stable, so the HTML handed to the browser is identical and the
+# map is not redrawn.
+
+def map_key(*parts):
+	source = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+	return hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+class MapCache:
+	def __init__(self, max_entries=64):
+		self.max_entries = max_entries
+		self._entries = OrderedDict()
+		self._lock = threading.Lock()
+		self.hits = 0
+		self.misses = 0
+
+	# the cached (map or HTML, lock) for key, built with build() on a miss;
+	# hold the lock while rendering a map, folium maps are not safe to render
+	# concurrently
+	def get(self, key, build):
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is not None:
+				self._entries.move_to_end(key)
+				self.hits += 1
+				return entry
+		entry = (build(), threading.Lock())
+		with self._lock:
+			entry = self._entries.setdefault(key, entry)
+			self._entries.move_to_end(key)
+			self.misses += 1
+			while len(self._entries) > self.max_entries:
+				self._entries.popitem(last=False)
+		return entry
+
+	def stats(self):
+		with self._lock:
+			return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+import os
+import pickle
+import re
+import sqlite3
+import threading
+import time
+import uuid
+
+# Shared on-disk result cache for run_query.
+# Every Streamlit process on the host opens the same SQLite file, so warm reruns,
+# restarts and new replicas are served without a warehouse round trip.
+
+# quoted literals and identifiers are kept as-is when normalizing a query
+_QUOTED = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+
+_SCHEMA = """
+create table if not exists entries (key text primary key, value blob, size integer, expires real, last_used real);
+create table if not exists locks (key text primary key, owner text, expires real);
+create table if not exists counters (name text primary key, value integer);
+create index if not exists entries_last_used on entries (last_used);
+"""
+
+# collapse whitespace and case outside of quotes so that trivially different
+# spellings of the same statement share one cache entry
+def normalize_query(query):
+	parts = _QUOTED.split(query.strip().rstrip(";").strip())
+	for i in range(0, len(parts), 2):
+		part = re.sub(r"\s+", " ", parts[i].lower())
+		parts[i] = re.sub(r"\s*([,()=])\s*", r"\1", part)
+	return "".join(parts)
+
+class QueryCache:
+	def __init__(self, path=".geo_hol_cache.sqlite", max_bytes=64 * 1024 * 1024, default_ttl=600, lock_timeout=120, poll_interval=0.1):
+		self.path = path
+		self.max_bytes = max_bytes
+		self.default_ttl = default_ttl
+		self.lock_timeout = lock_timeout
+		self.poll_interval = poll_interval
+		self.owner = "%s-%s" % (os.getpid(), uuid.uuid4().hex)
+		self._local = threading.local()
+		self._db().executescript(_SCHEMA)
+
+	# one sqlite connection per thread, in autocommit mode
+	def _db(self):
+		db = getattr(self._local, "db", None)
+		if db is None:
+			db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+			db.execute("pragma journal_mode=wal")
+			db.execute("pragma synchronous=normal")
+			self._local.db = db
+		return db
+
+	def _count(self, name, n=1):
+		self._db().execute("insert into counters (name, value) values (?, ?) on conflict(name) do update set value = value + excluded.value", (name, n))
+
+	def get(self, key):
+		now = time.time()
+		db = self._db()
+		row = db.execute("select value, expires from entries where key = ?", (key,)).fetchone()
+		if row is None:
+			return False, None
+		if row[1] <= now:
+			db.execute("delete from entries where key = ? and expires <= ?", (key, now))
+			return False, None
+		db.execute("update entries set last_used = ? where key = ?", (now, key))
+		return True, pickle.loads(row[0])
+
+	def put(self, key, value, ttl=None):
+		now = time.time()
+		blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+		if len(blob) > self.max_bytes:
+			return
+		ttl = self.default_ttl if ttl is None else ttl
+		db = self._db()
+		db.execute("begin immediate")
+		try:
+			db.execute("insert or replace into entries (key, value, size, expires, last_used) values (?, ?, ?, ?, ?)", (key, blob, len(blob), now + ttl, now))
+			self._evict(db, now)
+			db.execute("commit")
+		except BaseException:
+			db.execute("rollback")
+			raise
+
+	# drop expired entries, then least recently used ones until under max_bytes
+	def _evict(self, db, now):
+		db.execute("delete from entries where expires <= ?", (now,))
+		total = db.execute("select coalesce(sum(size), 0) from entries").fetchone()[0]
+		if total <= self.max_bytes:
+			return
+		evicted = 0
+		for key, size in db.execute("select key, size from entries order by last_used").fetchall():
+			if total <= self.max_bytes:
+				break
+			db.execute("delete from entries where key = ?", (key,))
+			total -= size
+			evicted += 1
+		self._count("evictions", evicted)
+
+	# only one process at a time may execute a given missing query
+	def _acquire(self, key):
+		now = time.time()
+		db = self._db()
+		db.execute("begin immediate")
+		try:
+			row = db.execute("select expires from locks where key = ?", (key,)).fetchone()
+			if row is not None and row[0] > now:
+				db.execute("rollback")
+				return False
+			db.execute("insert or replace into locks (key, owner, expires) values (?, ?, ?)", (key, self.owner, now + self.lock_timeout))
+			db.execute("commit")
+			return True
+		except BaseException:
+			db.execute("rollback")
+			raise
+
+	def _release(self, key):
+		self._db().execute("delete from locks where key = ? and owner = ?", (key, self.owner))
+
+	# return the cached result for key (see sql_templates.cache_key and
+	# geo_app.result_key), or run fn() to produce and store it; concurrent
+	# callers for the same key wait for the first one instead of sending the
+	# same statement to the warehouse
+	def get_or_run(self, key, fn, ttl=None):
+		deadline = time.monotonic() + self.lock_timeout
+		waited = False
+		while True:
+			hit, value = self.get(key)
+			if hit:
+				self._count("waits" if waited else "hits")
+				return value
+			if self._acquire(key) or time.monotonic() > deadline:
+				break
+			waited = True
+			time.sleep(self.poll_interval)
+		self._count("misses")
+		try:
+			value = fn()
+			self.put(key, value, ttl)
+			return value
+		finally:
+			self._release(key)
+
+	def stats(self):
+		db = self._db()
+		stats = {"hits": 0, "misses": 0, "waits": 0, "evictions": 0}
+		stats.update(db.execute("select name, value from counters").fetchall())
+		stats["entries"], stats["bytes"] = db.execute("select count(*), coalesce(sum(size), 0) from entries").fetchone()
+		return stats
+
+	def clear(self):
+		self._db().execute("delete from entries")
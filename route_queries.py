@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+from sql_templates import query
+
+# Query composition for the shopping route used on pages 5-7.
+# The stops (nearest Best Buy, liquor store and coffee shop, plus the liquor
+# store and coffee shop nearest that Best Buy) are computed by the single
+# "locations" template, and every later line, length, polygon, perimeter and
+# point-in-polygon query is built from those points as a WKT parameter instead
+# of re-running the `locations` CTE and its st_dwithin scans each time.
+
+# order in which the stops are visited after leaving home (page 5 and page 6/7)
+UNOPTIMIZED_STOPS = ("best_buy", "home_alcohol", "home_coffee")
+OPTIMIZED_STOPS = ("home_coffee", "best_buy_alcohol", "best_buy")
+
+def coordinates_wkt(points):
+	return ", ".join("%r %r" % (lon, lat) for lon, lat in points)
+
+def locations_query(origin):
+	return query("locations", **origin)
+
+class Route:
+	def __init__(self, rows, origin):
+		self.home = (origin["lon"], origin["lat"])
+		self.stops = {row[0]: row for row in rows}
+		# the displayed join queries use the id of the Best Buy that was found
+		self.params = dict(origin)
+		if "best_buy" in self.stops:
+			self.params["store_id"] = self.stops["best_buy"][1]
+
+	# rows in the shape of the page 5/6 "closest shop" queries:
+	# id, coordinates, name, addr_housenumber, addr_street, distance_meters
+	def stop_rows(self, stop):
+		return [self.stops[stop][1:7]] if stop in self.stops else []
+
+	# home followed by the stops that were found, in visiting order
+	def points(self, optimized=False):
+		order = OPTIMIZED_STOPS if optimized else UNOPTIMIZED_STOPS
+		return [self.home] + [(float(self.stops[stop][7]), float(self.stops[stop][8])) for stop in order if stop in self.stops]
+
+	# the route returns home, which also closes the ring for the polygon
+	def linestring_wkt(self, optimized=False):
+		return "LINESTRING(%s)" % coordinates_wkt(self.points(optimized) + [self.home])
+
+	def multipoint_query(self):
+		return query("wkt_multipoint", multipoint="MULTIPOINT(%s)" % ", ".join("(%s)" % coordinates_wkt([point]) for point in self.points()))
+
+	def linestring_query(self, optimized=False):
+		return query("wkt_linestring", linestring=self.linestring_wkt(optimized))
+
+	def length_query(self, optimized=False):
+		return query("wkt_length", linestring=self.linestring_wkt(optimized))
+
+	def polygon_query(self):
+		return query("wkt_polygon", linestring=self.linestring_wkt(optimized=True))
+
+	def perimeter_query(self):
+		return query("wkt_perimeter", linestring=self.linestring_wkt(optimized=True))
+
+	def shops_in_polygon_query(self):
+		return query("wkt_shops_in_polygon", linestring=self.linestring_wkt(optimized=True))
+
+	def polygon_with_points_query(self):
+		return query("wkt_polygon_with_points", linestring=self.linestring_wkt(optimized=True))
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+
+import math
+import threading
+
+import numpy as np
+
+from geography import BOUNDARY_DEGREES, EARTH_RADIUS, dumps, point
+
+# In-process spatial index over the OSM NY shop views.
+# Shop points are loaded once into NumPy lon/lat columns, bucketed into a
+# regular lon/lat grid, so radius, nearest-neighbor and point-in-polygon
+# lookups around any origin run without a warehouse round trip.
+
+# rows of the "shop_points" template
+COLUMNS = ("id", "lon", "lat", "name", "shop", "addr_housenumber", "addr_street", "electronics", "food_beverages")
+
+# meters per degree of latitude
+_METERS_PER_DEGREE = math.pi * EARTH_RADIUS / 180
+
+def haversine(lon, lat, lons, lats):
+	lon, lat = math.radians(lon), math.radians(lat)
+	lons, lats = np.radians(lons), np.radians(lats)
+	a = np.sin((lats - lat) / 2) ** 2 + math.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+	return 2 * EARTH_RADIUS * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+class ShopIndex:
+	# columns are sequences (or NumPy arrays) in the order of COLUMNS
+	def __init__(self, columns, cell_degrees=0.005):
+		self.cell_degrees = cell_degrees
+		lon = np.asarray(columns[1], dtype=np.float64)
+		lat = np.asarray(columns[2], dtype=np.float64)
+		cells = self._cells(lon, lat)
+		order = np.argsort(cells, kind="stable")
+		self.lon, self.lat = lon[order], lat[order]
+		self.ids = np.asarray(columns[0], dtype=object)[order]
+		self.names = np.asarray(columns[3], dtype=object)[order]
+		self.shops = np.asarray(columns[4], dtype=object)[order]
+		self.housenumbers = np.asarray(columns[5], dtype=object)[order]
+		self.streets = np.asarray(columns[6], dtype=object)[order]
+		self.views = {
+			"electronics": np.asarray(columns[7], dtype=bool)[order],
+			"food_beverages": np.asarray(columns[8], dtype=bool)[order],
+		}
+		# grid cell -> slice of the sorted columns
+		keys, starts, counts = np.unique(cells[order], return_index=True, return_counts=True)
+		self._grid = {int(k): (int(s), int(s + c)) for k, s, c in zip(keys, starts, counts)}
+		self._masks = {}
+
+	@classmethod
+	def from_rows(cls, rows, **kwargs):
+		return cls(list(zip(*rows)) if rows else [()] * len(COLUMNS), **kwargs)
+
+	# from an Arrow table of the "shop_points" template, converted column by
+	# column without a Python tuple per row; like any columns, they are still
+	# copied once into grid order by __init__
+	@classmethod
+	def from_arrow(cls, table, **kwargs):
+		if table is None:
+			return cls.from_rows([], **kwargs)
+		return cls([table.column(i).to_numpy(zero_copy_only=False) for i in range(len(COLUMNS))], **kwargs)
+
+	def __len__(self):
+		return len(self.lon)
+
+	def _cells(self, lon, lat):
+		return (np.floor(lon / self.cell_degrees).astype(np.int64) << 32) + np.floor(lat / self.cell_degrees).astype(np.int64)
+
+	# boolean filter for a view and/or an exact shop type or name, cached per combination
+	def mask(self, view=None, shop=None, name=None):
+		key = (view, shop, name)
+		if key not in self._masks:
+			mask = np.ones(len(self), dtype=bool)
+			if view is not None:
+				mask &= self.views[view]
+			if shop is not None:
+				mask &= self.shops == shop
+			if name is not None:
+				mask &= self.names == name
+			self._masks[key] = mask
+		return self._masks[key]
+
+	# indices of the points in the grid cells overlapping a lon/lat box
+	def _candidates(self, min_lon, min_lat, max_lon, max_lat):
+		slices = []
+		for x in range(int(math.floor(min_lon / self.cell_degrees)), int(math.floor(max_lon / self.cell_degrees)) + 1):
+			for y in range(int(math.floor(min_lat / self.cell_degrees)), int(math.floor(max_lat / self.cell_degrees)) + 1):
+				cell = self._grid.get((x << 32) + y)
+				if cell is not None:
+					slices.append(np.arange(*cell))
+		return np.concatenate(slices) if slices else np.empty(0, dtype=np.int64)
+
+	# points within meters of lon/lat, closest first: (indices, distances)
+	def radius(self, lon, lat, meters, mask=None):
+		dlat = meters / _METERS_PER_DEGREE
+		dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+		candidates = self._candidates(lon - dlon, lat - dlat, lon + dlon, lat + dlat)
+		if mask is not None:
+			candidates = candidates[mask[candidates]]
+		distances = haversine(lon, lat, self.lon[candidates], self.lat[candidates])
+		keep = distances <= meters
+		candidates, distances = candidates[keep], distances[keep]
+		order = np.argsort(distances, kind="stable")
+		return candidates[order], distances[order]
+
+	# the k closest points, optionally only within meters
+	def nearest(self, lon, lat, k=1, meters=None, mask=None):
+		if meters is not None:
+			indices, distances = self.radius(lon, lat, meters, mask)
+			return indices[:k], distances[:k]
+		indices = np.arange(len(self)) if mask is None else np.flatnonzero(mask)
+		distances = haversine(lon, lat, self.lon[indices], self.lat[indices])
+		order = np.argsort(distances, kind="stable")[:k]
+		return indices[order], distances[order]
+
+	# points inside a polygon given as a list of [lon, lat] rings (exterior
+	# first); as ST_WITHIN, points on the boundary are not inside
+	def within_polygon(self, rings, mask=None):
+		exterior = np.asarray(rings[0], dtype=np.float64)
+		candidates = self._candidates(exterior[:, 0].min(), exterior[:, 1].min(), exterior[:, 0].max(), exterior[:, 1].max())
+		if mask is not None:
+			candidates = candidates[mask[candidates]]
+		lon, lat = self.lon[candidates], self.lat[candidates]
+		inside = _in_ring(lon, lat, exterior) & ~_on_ring(lon, lat, exterior)
+		for hole in rings[1:]:
+			hole = np.asarray(hole, dtype=np.float64)
+			inside &= ~_in_ring(lon, lat, hole) & ~_on_ring(lon, lat, hole)
+		return candidates[inside]
+
+	# id, coordinates, name, addr_housenumber, addr_street, as in the shop views
+	def row(self, i):
+		return (self.ids[i], dumps(point(float(self.lon[i]), float(self.lat[i]))), self.names[i], self.housenumbers[i], self.streets[i])
+
+# even-odd ray casting, vectorized over the points
+def _in_ring(lon, lat, ring):
+	inside = np.zeros(len(lon), dtype=bool)
+	for (x1, y1), (x2, y2) in zip(ring[:-1], ring[1:]):
+		if y1 == y2:
+			continue
+		crosses = (y1 > lat) != (y2 > lat)
+		inside ^= crosses & (lon < x1 + (lat - y1) * (x2 - x1) / (y2 - y1))
+	return inside
+
+# points on an edge of the ring, from their distance to each segment
+def _on_ring(lon, lat, ring, tolerance=BOUNDARY_DEGREES):
+	on = np.zeros(len(lon), dtype=bool)
+	for (x1, y1), (x2, y2) in zip(ring[:-1], ring[1:]):
+		dx, dy = x2 - x1, y2 - y1
+		length2 = dx * dx + dy * dy
+		t = np.clip(((lon - x1) * dx + (lat - y1) * dy) / length2, 0.0, 1.0) if length2 else 0.0
+		on |= np.hypot(lon - x1 - t * dx, lat - y1 - t * dy) <= tolerance
+	return on
+
+# the masked point nearest to each of many origins and its distance, or -1
+# and nan where there is none within meters; vectorized over blocks of origins
+def nearest_many(index, lons, lats, meters, mask, block=256):
+	lons, lats = np.asarray(lons, dtype=np.float64), np.asarray(lats, dtype=np.float64)
+	found = np.full(len(lons), -1, dtype=np.int64)
+	distances = np.full(len(lons), np.nan)
+	candidates = np.flatnonzero(mask)
+	if not len(candidates):
+		return found, distances
+	c_lon, c_lat = np.radians(index.lon[candidates]), np.radians(index.lat[candidates])
+	for start in range(0, len(lons), block):
+		lon = np.radians(lons[start:start + block])[:, None]
+		lat = np.radians(lats[start:start + block])[:, None]
+		a = np.sin((c_lat - lat) / 2) ** 2 + np.cos(lat) * np.cos(c_lat) * np.sin((c_lon - lon) / 2) ** 2
+		d = 2 * EARTH_RADIUS * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+		nearest = np.argmin(d, axis=1)
+		nearest_distances = d[np.arange(len(nearest)), nearest]
+		within = nearest_distances <= meters
+		found[start:start + block] = np.where(within, candidates[nearest], -1)
+		distances[start:start + block] = np.where(within, nearest_distances, np.nan)
+	return found, distances
+
+# the stops of the "locations" template for many origins sharing the filters
+# of origin: {stop: (indices, distances)}, -1 where a stop was not found
+def locations_many(index, lons, lats, origin):
+	meters = origin["radius"]
+	stops = {"best_buy": nearest_many(index, lons, lats, meters, index.mask("electronics", name=origin["store_name"]))}
+	best_buy = stops["best_buy"][0]
+	# shops near each Best Buy found, computed once per distinct Best Buy
+	stores, inverse = np.unique(best_buy, return_inverse=True)
+	for stop, shop in (("alcohol", origin["liquor_shop"]), ("coffee", origin["coffee_shop"])):
+		mask = index.mask("food_beverages", shop=shop)
+		stops["home_" + stop] = nearest_many(index, lons, lats, meters, mask)
+		found = stores >= 0
+		near_store = np.full(len(stores), -1, dtype=np.int64)
+		near_store_distances = np.full(len(stores), np.nan)
+		near_store[found], near_store_distances[found] = nearest_many(index, index.lon[stores[found]], index.lat[stores[found]], meters, mask)
+		stops["best_buy_" + stop] = (near_store[inverse], near_store_distances[inverse])
+	return stops
+
+LOCATION_STOPS = ("best_buy", "home_alcohol", "home_coffee", "best_buy_alcohol", "best_buy_coffee")
+
+# the rows of the "locations" template, answered from the index
+def locations_rows(index, origin):
+	stops = locations_many(index, [origin["lon"]], [origin["lat"]], origin)
+	rows = []
+	for stop in LOCATION_STOPS:
+		found, distances = stops[stop]
+		if found[0] >= 0:
+			i, distance = found[0], float(distances[0])
+			# distances from home are rounded like the template's, the others are not
+			rows.append((stop,) + index.row(i) + (distance if stop.startswith("best_buy_") else round(distance, 2), float(index.lon[i]), float(index.lat[i])))
+	return rows
+
+# holds the current index and rebuilds it with load() when the source fingerprint changes
+class IndexCache:
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._fingerprint = None
+		self._index = None
+
+	def get(self, fingerprint, load):
+		with self._lock:
+			if self._index is None or fingerprint != self._fingerprint:
+				self._index = load()
+				self._fingerprint = fingerprint
+			return self._index
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+
+import hashlib
+import re
+from collections import namedtuple
+
+from query_cache import normalize_query
+
+# Registry of every SQL statement the app shows or runs, each kept once.
+# Placeholders use %(name)s; render() inlines them as literals for the SQL
+# shown on the pages, bind() turns them into server-side :N bind variables so
+# the statement text (and the warehouse plan and result cache) is the same
+# for every origin, radius and shop filter.
+
+HOME = (-73.986226, 40.755702)
+
+_PLACEHOLDER = re.compile(r"%\((\w+)\)s")
+
+# a template id plus the parameters it uses, hashable so it can key memo and futures
+Query = namedtuple("Query", "template params")
+
+def origin_params(lon, lat, radius=1600, store_name="Best Buy", store_id=1428036403, liquor_shop="alcohol", coffee_shop="coffee"):
+	return {
+		"home": "POINT(%r %r)" % (lon, lat),
+		"lon": lon,
+		"lat": lat,
+		"radius": radius,
+		"store_name": store_name,
+		"store_id": store_id,
+		"liquor_shop": liquor_shop,
+		"coffee_shop": coffee_shop,
+	}
+
+# Building blocks of the statements shown in the quickstart
+
+def _closest(view, column, param):
+	return ("select id, coordinates, name, addr_housenumber, addr_street, \n"
+		"st_distance(coordinates,to_geography(%(home)s))::number(6,2) \n"
+		"as distance_meters \n"
+		"from " + view + " \n"
+		"where " + column + " = %(" + param + ")s and \n"
+		"st_dwithin(coordinates,st_makepoint(%(lon)s, %(lat)s),%(radius)s) = true \n"
+		"order by 6 limit 1;")
+
+def _nearest(view, column, param):
+	return ("(select coordinates, \n"
+		"st_distance(coordinates,to_geography(%(home)s))::number(6,2) \n"
+		"as distance_meters from " + view + " \n"
+		"where " + column + " = %(" + param + ")s and \n"
+		"st_dwithin(coordinates,st_makepoint(%(lon)s, %(lat)s),%(radius)s) = true \n"
+		"order by 2 limit 1)")
+
+def _join(columns, param):
+	return ("select " + columns + ", \n"
+		"st_distance(e.coordinates,fb.coordinates) as distance_meters \n"
+		"from v_osm_ny_shop_electronics e \n"
+		"join v_osm_ny_shop_food_beverages fb on st_dwithin(e.coordinates,fb.coordinates,%(radius)s) \n"
+		"where e.id = %(store_id)s and fb.shop = %(" + param + ")s \n")
+
+def _locations(*members):
+	return "with locations as (\n" + " \nunion all \n".join(members) + ") \n"
+
+_HOME = "(select to_geography(%(home)s) as coordinates, \n0 as distance_meters)"
+_BEST_BUY = _nearest("v_osm_ny_shop_electronics", "name", "store_name")
+_LIQUOR_STORE = _nearest("v_osm_ny_shop_food_beverages", "shop", "liquor_shop")
+_COFFEE_SHOP = _nearest("v_osm_ny_shop_food_beverages", "shop", "coffee_shop")
+_ROUTE = _locations(_HOME, _BEST_BUY, _LIQUOR_STORE, _COFFEE_SHOP)
+_OPTIMIZED_ROUTE = _locations(_HOME, _COFFEE_SHOP, "(" + _join("fb.coordinates", "liquor_shop") + "order by 2 limit 1)", _BEST_BUY)
+_LINE = "st_makeline(st_collect(coordinates), \nto_geography(%(home)s))"
+_POLYGON = "st_makepolygon(" + _LINE + ")"
+_SEARCH_AREA = "with search_area as (\n" + _OPTIMIZED_ROUTE + "select " + _POLYGON + " as polygon from locations) \n"
+_TILE = "st_x(coordinates) >= %(min_lon)s and st_x(coordinates) < %(max_lon)s and st_y(coordinates) >= %(min_lat)s and st_y(coordinates) < %(max_lat)s"
+
+TEMPLATES = {
+	# shown on the pages, and run as-is where the page runs the same statement
+	"point": "select to_geography(%(home)s);",
+	"closest_best_buy": "// Find the closest Best Buy \n" + _closest("v_osm_ny_shop_electronics", "name", "store_name"),
+	"closest_liquor_store": "// Find the closest liquor store \n" + _closest("v_osm_ny_shop_food_beverages", "shop", "liquor_shop"),
+	"closest_coffee_shop": "// Find the closest coffee shop \n" + _closest("v_osm_ny_shop_food_beverages", "shop", "coffee_shop"),
+	"route_multipoint": "// Create the CTE 'locations' \n" + _ROUTE + "select st_collect(coordinates) as multipoint from locations;",
+	"route_makeline": "select " + _LINE,
+	"route_linestring": _ROUTE + "select " + _LINE + " \nas linestring from locations;",
+	"route_length": "// Calculate the length of the linestring in meters \n" + _ROUTE + "// Feed the linestring into an st_length calculation \nselect st_length(" + _LINE + ") \nas length_meters from locations;",
+	"join_liquor_store": "// Join to electronics to find a liquor store closer to Best Buy \n" + _join("fb.id,fb.coordinates,fb.name,fb.addr_housenumber,fb.addr_street", "liquor_shop") + "order by 6 limit 1;",
+	"join_coffee_shop": "// Do the same for a coffee shop \n" + _join("fb.id,fb.coordinates,fb.name,fb.addr_housenumber,fb.addr_street", "coffee_shop") + "order by 6 limit 1;",
+	"optimized_linestring": "// Replace the liquor store in our previous linestring query \n" + _OPTIMIZED_ROUTE + "select " + _LINE + " as linestring from locations;",
+	"optimized_length": "// Calculate the distance of the new linestring \n" + _OPTIMIZED_ROUTE + "select st_length(" + _LINE + ") as length_meters from locations;",
+	"route_makepolygon": "select " + _POLYGON,
+	"route_polygon": _OPTIMIZED_ROUTE + "select " + _POLYGON + " as polygon from locations;",
+	"route_perimeter": _OPTIMIZED_ROUTE + "select st_perimeter(" + _POLYGON + ") as perimeter_meters from locations;",
+	"route_shops_in_polygon": _SEARCH_AREA + "select sh.id,sh.coordinates,sh.name,sh.shop,sh.addr_housenumber,sh.addr_street \nfrom v_osm_ny_shop sh \njoin search_area sa on st_within(sh.coordinates,sa.polygon);",
+	"route_polygon_with_points": "with final_plot as (\n(" + _OPTIMIZED_ROUTE + "select " + _POLYGON + " as polygon from locations) \nunion all \n(" + _SEARCH_AREA + "select sh.coordinates \nfrom v_osm_ny_shop sh \njoin search_area sa on st_within(sh.coordinates,sa.polygon))) \nselect st_collect(polygon)from final_plot;",
+
+	# run by the app: all route stops in one statement (see route_queries), and
+	# the later steps built from the stops as WKT; geographies drawn on a map
+	# are fetched as WKB and decoded with geography.map_geometry
+	"map_point": "select st_aswkb(to_geography(%(home)s));",
+	"locations": """
+with best_buy as (
+	select id, coordinates, name, addr_housenumber, addr_street,
+		round(st_distance(coordinates, to_geography(%(home)s)), 2) as distance_meters
+	from v_osm_ny_shop_electronics
+	where name = %(store_name)s and st_dwithin(coordinates, st_makepoint(%(lon)s, %(lat)s), %(radius)s)
+	order by 6 limit 1),
+food_beverages as (
+	select fb.id, fb.coordinates, fb.name, fb.addr_housenumber, fb.addr_street, fb.shop,
+		st_distance(fb.coordinates, to_geography(%(home)s)) as home_distance,
+		st_distance(fb.coordinates, b.coordinates) as best_buy_distance
+	from v_osm_ny_shop_food_beverages fb
+	left join best_buy b on st_dwithin(fb.coordinates, b.coordinates, %(radius)s)
+	where fb.shop in (%(liquor_shop)s, %(coffee_shop)s) and
+		(st_dwithin(fb.coordinates, st_makepoint(%(lon)s, %(lat)s), %(radius)s) or b.id is not null)),
+near_home as (
+	select case when shop = %(liquor_shop)s then 'home_alcohol' else 'home_coffee' end as stop,
+		id, coordinates, name, addr_housenumber, addr_street, round(home_distance, 2) as distance_meters,
+		row_number() over (partition by shop order by home_distance) as stop_rank
+	from food_beverages where home_distance <= %(radius)s),
+near_best_buy as (
+	select case when shop = %(liquor_shop)s then 'best_buy_alcohol' else 'best_buy_coffee' end as stop,
+		id, coordinates, name, addr_housenumber, addr_street, best_buy_distance as distance_meters,
+		row_number() over (partition by shop order by best_buy_distance) as stop_rank
+	from food_beverages where best_buy_distance is not null)
+select 'best_buy' as stop, id, coordinates, name, addr_housenumber, addr_street, distance_meters, st_x(coordinates) as lon, st_y(coordinates) as lat from best_buy
+union all
+select stop, id, coordinates, name, addr_housenumber, addr_street, distance_meters, st_x(coordinates), st_y(coordinates) from near_home where stop_rank = 1
+union all
+select stop, id, coordinates, name, addr_housenumber, addr_street, distance_meters, st_x(coordinates), st_y(coordinates) from near_best_buy where stop_rank = 1;
+""",
+	# loaded once into the in-process shop_index, and its change detection
+	"shop_points": """
+select sh.id, st_x(sh.coordinates) as lon, st_y(sh.coordinates) as lat, sh.name, sh.shop, sh.addr_housenumber, sh.addr_street,
+	e.id is not null as electronics, fb.id is not null as food_beverages
+from v_osm_ny_shop sh
+left join v_osm_ny_shop_electronics e on e.id = sh.id
+left join v_osm_ny_shop_food_beverages fb on fb.id = sh.id;
+""",
+	"shop_index_fingerprint": "select count(*), hash_agg(sh.id, st_x(sh.coordinates), st_y(sh.coordinates), sh.name, sh.shop, sh.addr_housenumber, sh.addr_street, e.id, fb.id) from v_osm_ny_shop sh left join v_osm_ny_shop_electronics e on e.id = sh.id left join v_osm_ny_shop_food_beverages fb on fb.id = sh.id;",
+	# one lon/lat tile of the explore page: its shops, or for large radii their
+	# count and mean position per cell of a finer grid
+	"tile_shops": "select id, st_x(coordinates) as lon, st_y(coordinates) as lat, name, shop from v_osm_ny_shop where " + _TILE + ";",
+	"tile_clusters": "select floor(st_x(coordinates) / %(cell)s) as x, floor(st_y(coordinates) / %(cell)s) as y, count(*) as shops, avg(st_x(coordinates)) as lon, avg(st_y(coordinates)) as lat from v_osm_ny_shop where " + _TILE + " group by 1, 2;",
+	"wkt_multipoint": "select to_geography(%(multipoint)s) as multipoint;",
+	"wkt_linestring": "select st_aswkb(to_geography(%(linestring)s)) as linestring;",
+	"wkt_length": "select st_length(to_geography(%(linestring)s)) as length_meters;",
+	"wkt_polygon": "select st_aswkb(st_makepolygon(to_geography(%(linestring)s))) as polygon;",
+	"wkt_perimeter": "select st_perimeter(st_makepolygon(to_geography(%(linestring)s))) as perimeter_meters;",
+	"wkt_shops_in_polygon": "select sh.id, sh.coordinates, sh.name, sh.shop, sh.addr_housenumber, sh.addr_street from v_osm_ny_shop sh where st_within(sh.coordinates, st_makepolygon(to_geography(%(linestring)s)));",
+	"wkt_polygon_with_points": "with search_area as (select st_makepolygon(to_geography(%(linestring)s)) as polygon) select st_aswkb(st_collect(geo)) from (select polygon as geo from search_area union all select sh.coordinates from v_osm_ny_shop sh join search_area sa on st_within(sh.coordinates, sa.polygon));",
+}
+
+def placeholders(template):
+	names = []
+	for name in _PLACEHOLDER.findall(TEMPLATES[template]):
+		if name not in names:
+			names.append(name)
+	return names
+
+# only the parameters the template uses become part of the query (and its cache key)
+def query(template, **params):
+	return Query(template, tuple((name, params[name]) for name in placeholders(template)))
+
+def literal(value):
+	if isinstance(value, str):
+		return "'%s'" % value.replace("'", "''")
+	return repr(value)
+
+# the statement as shown to the reader, with the parameters inlined
+def render(template, **params):
+	return _PLACEHOLDER.sub(lambda match: literal(params[match.group(1)]), TEMPLATES[template])
+
+# the statement and values for cursor.execute with paramstyle="numeric"
+def bind(query):
+	params = dict(query.params)
+	names = placeholders(query.template)
+	sql = _PLACEHOLDER.sub(lambda match: ":%d" % (names.index(match.group(1)) + 1), TEMPLATES[query.template])
+	return sql, [params[name] for name in names]
+
+# template id, template text and parameters; editing a template retires its old entries
+def cache_key(query):
+	source = "%s\n%s\n%r" % (query.template, normalize_query(TEMPLATES[query.template]), query.params)
+	return hashlib.sha256(source.encode("utf-8")).hexdigest()
@@ -0,0 +1,53 @@
+import threading
+import time
+
+import pytest
+
+from connection_pool import ConnectionPool
+
+class FakeConnection:
+	def close(self):
+		pass
+
+def slow_connect(created, delay=0.2):
+	def connect():
+		time.sleep(delay)
+		created.append(threading.current_thread().name)
+		return FakeConnection()
+	return connect
+
+def test_concurrent_checkouts_stay_within_max_size():
+	created = []
+	pool = ConnectionPool(slow_connect(created), min_size=0, max_size=2, checkout_timeout=10)
+	start = threading.Barrier(8)
+	def borrow():
+		start.wait()
+		with pool.connection():
+			time.sleep(0.05)
+	threads = [threading.Thread(target=borrow) for _ in range(8)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	metrics = pool.metrics()
+	assert len(created) == 2
+	assert metrics["created"] == 2
+	assert metrics["size"] == 2
+	assert metrics["checkouts"] == 8
+	pool.close()
+
+def test_failed_connect_frees_its_slot():
+	attempts = []
+	def connect():
+		attempts.append(1)
+		if len(attempts) == 1:
+			raise OSError("refused")
+		return FakeConnection()
+	pool = ConnectionPool(connect, min_size=0, max_size=1, checkout_timeout=1)
+	with pytest.raises(OSError):
+		pool.checkout()
+	assert pool.metrics()["size"] == 0
+	conn = pool.checkout()
+	assert pool.metrics()["size"] == 1
+	pool.checkin(conn)
+	pool.close()
@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+import geography
+from exploration import TileCache, explore, tile_size, tiles
+from sql_templates import HOME
+
+@pytest.mark.parametrize("radius", [100, 800, 1600, 4000, 10000, 50000])
+def test_a_view_needs_at_most_nine_tiles(radius):
+	for lon, lat in (HOME, (HOME[0] + 0.013, HOME[1] - 0.021)):
+		size = tile_size(lat, radius)
+		assert len(tiles(lon, lat, radius, size)) <= 9
+
+# tile queries answered from a list of (id, lon, lat, name, shop), counting statements
+class Warehouse:
+	def __init__(self, shops):
+		self.shops = shops
+		self.statements = 0
+
+	def fetch(self, queries):
+		self.statements += len(queries)
+		results = []
+		for q in queries:
+			params = dict(q.params)
+			inside = [s for s in self.shops if params["min_lon"] <= s[1] < params["max_lon"] and params["min_lat"] <= s[2] < params["max_lat"]]
+			if q.template == "tile_shops":
+				results.append(inside)
+				continue
+			cells = {}
+			for s in inside:
+				cells.setdefault((s[1] // params["cell"], s[2] // params["cell"]), []).append(s)
+			results.append([(x, y, len(c), sum(s[1] for s in c) / len(c), sum(s[2] for s in c) / len(c)) for (x, y), c in cells.items()])
+		return results
+
+@pytest.fixture
+def warehouse():
+	rng = random.Random(3)
+	return Warehouse([(n, HOME[0] + rng.uniform(-0.2, 0.2), HOME[1] + rng.uniform(-0.2, 0.2), "shop %d" % n, "books") for n in range(20000)])
+
+def test_points_match_brute_force(warehouse):
+	result = explore(*HOME, 1600, TileCache(), warehouse.fetch, max_points=10000)
+	expected = sorted(s[0] for s in warehouse.shops if geography.haversine(*HOME, s[1], s[2]) <= 1600)
+	assert sorted(p[0] for p in result.points) == expected
+	assert result.fetched == result.tiles == warehouse.statements
+	assert not result.approximate
+
+def shops_within(warehouse, meters):
+	return sum(1 for s in warehouse.shops if geography.haversine(*HOME, s[1], s[2]) <= meters)
+
+def test_points_clustered_in_process_count_every_shop(warehouse):
+	result = explore(*HOME, 1600, TileCache(), warehouse.fetch, max_points=50)
+	assert not result.points
+	assert len(result.clusters) <= 50
+	assert not result.approximate
+	assert result.shops == sum(c[0] for c in result.clusters) == shops_within(warehouse, 1600)
+
+@pytest.mark.parametrize("radius", [4000, 6000, 10000])
+def test_clusters_from_the_warehouse_count_shops_approximately(warehouse, radius):
+	result = explore(*HOME, radius, TileCache(), warehouse.fetch, max_points=200, cluster_radius=4000)
+	assert not result.points
+	assert len(result.clusters) <= 200
+	assert warehouse.statements <= 9
+	assert result.approximate
+	assert result.shops == pytest.approx(shops_within(warehouse, radius), rel=0.1)
+
+def test_crossing_cluster_radius_within_a_tile_size_only_fetches_new_tiles(warehouse):
+	cache = TileCache()
+	size = tile_size(HOME[1], 3900)
+	assert size == tile_size(HOME[1], 4100)
+	explore(*HOME, 3900, cache, warehouse.fetch, cluster_radius=4000)
+	result = explore(*HOME, 4100, cache, warehouse.fetch, cluster_radius=4000)
+	assert result.fetched == len(set(tiles(*HOME, 4100, size)) - set(tiles(*HOME, 3900, size)))
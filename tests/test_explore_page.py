@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+pytest.importorskip("folium")
+streamlit_folium = pytest.importorskip("streamlit_folium")
+AppTest = pytest.importorskip("streamlit.testing.v1").AppTest
+
+import local_backend
+from sql_templates import HOME
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "quickstart_getting_started_with_geospatial_geography.py")
+
+# the Explore page driven through AppTest, with st_folium replaced by a map
+# that reports the given click
+def explore_page(tmp_path, monkeypatch, click):
+	extract = str(tmp_path / "shops.sqlite")
+	local_backend.generate_extract(extract, shops=500, seed=1)
+	drawn = []
+	def st_folium(fig, key=None, width=None, returned_objects=None, **kwargs):
+		drawn.append(key)
+		return {"last_clicked": click}
+	monkeypatch.setattr(streamlit_folium, "st_folium", st_folium)
+	at = AppTest.from_file(APP, default_timeout=60)
+	at.secrets["geo-hol-backend"] = "local"
+	at.secrets["geo-hol-local"] = {"path": extract}
+	at.secrets["geo-hol-cache"] = {"path": str(tmp_path / "cache.sqlite")}
+	at.run()
+	at.sidebar.radio[0].set_value("Explore").run()
+	assert not at.exception
+	return at, drawn
+
+def test_click_moves_the_origin(tmp_path, monkeypatch):
+	click = {"lng": HOME[0] + 0.01, "lat": HOME[1] - 0.005}
+	at, drawn = explore_page(tmp_path, monkeypatch, click)
+	assert at.session_state["explore_origin"] == (click["lng"], click["lat"])
+	# redrawn around the moved origin, and the repeated click is ignored
+	assert len(set(drawn)) == 2
+
+def test_click_closer_than_min_move_is_ignored(tmp_path, monkeypatch):
+	click = {"lng": HOME[0] + 0.00001, "lat": HOME[1]}
+	at, drawn = explore_page(tmp_path, monkeypatch, click)
+	assert at.session_state["explore_origin"] == HOME
+	assert len(set(drawn)) == 1
@@ -0,0 +1,19 @@
+import geography
+
+SQUARE = {"type": "Polygon", "coordinates": [[[-74.0, 40.7], [-73.99, 40.7], [-73.99, 40.71], [-74.0, 40.71], [-74.0, 40.7]]]}
+HOLE = [[-73.997, 40.703], [-73.993, 40.703], [-73.993, 40.707], [-73.997, 40.707], [-73.997, 40.703]]
+
+def test_within_interior():
+	assert geography.within(geography.point(-73.995, 40.701), SQUARE)
+	assert not geography.within(geography.point(-73.98, 40.705), SQUARE)
+
+def test_boundary_is_not_within():
+	# vertices and points on every edge, as ST_WITHIN
+	for lon, lat in SQUARE["coordinates"][0] + [[-73.995, 40.7], [-73.99, 40.705], [-73.995, 40.71], [-74.0, 40.705]]:
+		assert not geography.within(geography.point(lon, lat), SQUARE), (lon, lat)
+
+def test_hole_and_its_boundary_are_not_within():
+	polygon = {"type": "Polygon", "coordinates": SQUARE["coordinates"] + [HOLE]}
+	assert not geography.within(geography.point(-73.995, 40.705), polygon)
+	assert not geography.within(geography.point(-73.997, 40.705), polygon)
+	assert geography.within(geography.point(-73.998, 40.705), polygon)
@@ -0,0 +1,135 @@
+import json
+import shutil
+import sqlite3
+
+import pytest
+
+import geography
+import local_backend
+from sql_templates import HOME, bind, origin_params, query
+
+# the locations and wkt_* statements on a synthetic extract, against the
+# same answers computed by brute force over all of its rows
+
+@pytest.fixture(scope="module")
+def extract(tmp_path_factory):
+	path = str(tmp_path_factory.mktemp("extract") / "shops.sqlite")
+	local_backend.generate_extract(path, shops=2000, seed=7)
+	return path
+
+@pytest.fixture(scope="module")
+def conn(extract):
+	conn = local_backend.connect(extract)
+	yield conn
+	conn.close()
+
+def run(conn, q):
+	with conn.cursor() as cur:
+		cur.execute(*bind(q))
+		return cur.fetchall()
+
+# (id, lon, lat, name, shop) of every row of a view
+def shops(conn, view="v_osm_ny_shop"):
+	with conn.cursor() as cur:
+		cur.execute("select id, coordinates, name, shop from %s" % view)
+		return [(shop_id, *json.loads(coordinates)["coordinates"], name, shop) for shop_id, coordinates, name, shop in cur.fetchall()]
+
+def closest(candidates, lon, lat, meters):
+	found = [(geography.haversine(lon, lat, c[1], c[2]), c) for c in candidates]
+	found = [item for item in found if item[0] <= meters]
+	return min(found, key=lambda item: item[0]) if found else None
+
+def expected_locations(conn, origin):
+	lon, lat, meters = origin["lon"], origin["lat"], origin["radius"]
+	food_beverages = shops(conn, "v_osm_ny_shop_food_beverages")
+	expected = {}
+	best_buy = closest([s for s in shops(conn, "v_osm_ny_shop_electronics") if s[3] == origin["store_name"]], lon, lat, meters)
+	if best_buy:
+		expected["best_buy"] = (best_buy[1][0], round(best_buy[0], 2))
+	for name, shop in (("alcohol", origin["liquor_shop"]), ("coffee", origin["coffee_shop"])):
+		candidates = [s for s in food_beverages if s[4] == shop]
+		near_home = closest(candidates, lon, lat, meters)
+		if near_home:
+			expected["home_" + name] = (near_home[1][0], round(near_home[0], 2))
+		near_best_buy = best_buy and closest(candidates, best_buy[1][1], best_buy[1][2], meters)
+		if near_best_buy:
+			expected["best_buy_" + name] = (near_best_buy[1][0], near_best_buy[0])
+	return expected
+
+@pytest.mark.parametrize("offset, radius", [((0, 0), 1600), ((0.01, -0.008), 1600), ((-0.015, 0.012), 800), ((0, 0), 300)])
+def test_locations(conn, offset, radius):
+	origin = origin_params(HOME[0] + offset[0], HOME[1] + offset[1], radius=radius)
+	rows = {row[0]: row for row in run(conn, query("locations", **origin))}
+	expected = expected_locations(conn, origin)
+	assert rows.keys() == expected.keys()
+	for stop, (shop_id, distance) in expected.items():
+		assert rows[stop][1] == shop_id
+		assert rows[stop][6] == pytest.approx(distance, abs=0.01)
+
+# a rectangle whose edges run through shops, so that some lie on its boundary
+def rectangle(conn):
+	near = sorted(shops(conn), key=lambda s: geography.haversine(*HOME, s[1], s[2]))[:200]
+	lons, lats = sorted(s[1] for s in near), sorted(s[2] for s in near)
+	return lons[40], lats[40], lons[160], lats[160]
+
+def linestring(west, south, east, north):
+	return "LINESTRING(%r %r, %r %r, %r %r, %r %r, %r %r)" % (west, south, east, south, east, north, west, north, west, south)
+
+def test_rectangle_has_shops_on_its_boundary(conn):
+	west, south, east, north = rectangle(conn)
+	assert any(s[1] in (west, east) and south <= s[2] <= north for s in shops(conn))
+
+def test_wkt_shops_in_polygon(conn):
+	west, south, east, north = rectangle(conn)
+	rows = run(conn, query("wkt_shops_in_polygon", linestring=linestring(west, south, east, north)))
+	expected = {s[0] for s in shops(conn) if west < s[1] < east and south < s[2] < north}
+	assert expected
+	assert {row[0] for row in rows} == expected
+
+def test_wkt_polygon_with_points(conn):
+	west, south, east, north = rectangle(conn)
+	(wkb,), = run(conn, query("wkt_polygon_with_points", linestring=linestring(west, south, east, north)))
+	polygon, *points = geography.from_wkb(wkb)["geometries"]
+	assert polygon["coordinates"][0][0] == [west, south]
+	expected = sorted([s[1], s[2]] for s in shops(conn) if west < s[1] < east and south < s[2] < north)
+	assert sorted(p["coordinates"] for p in points) == expected
+
+def test_wkt_length_and_perimeter(conn):
+	west, south, east, north = rectangle(conn)
+	line = linestring(west, south, east, north)
+	corners = [(west, south), (east, south), (east, north), (west, north), (west, south)]
+	expected = sum(geography.haversine(*corners[i], *corners[i + 1]) for i in range(4))
+	(length,), = run(conn, query("wkt_length", linestring=line))
+	(perimeter,), = run(conn, query("wkt_perimeter", linestring=line))
+	assert length == pytest.approx(expected)
+	assert perimeter == pytest.approx(expected)
+
+def test_generate_extract_is_deterministic(extract, tmp_path):
+	again = str(tmp_path / "again.sqlite")
+	local_backend.generate_extract(again, shops=2000, seed=7)
+	first, second = local_backend.connect(extract), local_backend.connect(again)
+	try:
+		for view in local_backend.VIEWS:
+			assert shops(first, view) == shops(second, view)
+	finally:
+		first.close()
+		second.close()
+
+def test_shop_index_fingerprint_changes_with_any_shop(extract, tmp_path):
+	def fingerprint(path):
+		conn = local_backend.connect(path)
+		try:
+			return run(conn, query("shop_index_fingerprint"))[0]
+		finally:
+			conn.close()
+	moved = geography.dumps(geography.point(-73.98, 40.75))
+	changed = str(tmp_path / "changed.sqlite")
+	fingerprints = {fingerprint(extract)}
+	for column, value in (("coordinates", moved), ("name", "Renamed"), ("shop", "books")):
+		shutil.copy(extract, changed)
+		db = sqlite3.connect(changed)
+		db.execute("update v_osm_ny_shop set %s = ? where id = 1" % column, (value,))
+		db.commit()
+		db.close()
+		fingerprints.add(fingerprint(changed))
+	assert len(fingerprints) == 4
@@ -0,0 +1,75 @@
+import threading
+import time
+
+import pytest
+
+from query_cache import QueryCache
+
+@pytest.fixture
+def cache(tmp_path):
+	return QueryCache(path=str(tmp_path / "cache.sqlite"), poll_interval=0.01)
+
+def test_evicts_least_recently_used_down_to_max_bytes(tmp_path):
+	cache = QueryCache(path=str(tmp_path / "cache.sqlite"), max_bytes=3500)
+	value = "x" * 1000
+	for key in ("a", "b", "c"):
+		cache.put(key, value)
+		time.sleep(0.01)
+	assert cache.get("a") == (True, value)
+	time.sleep(0.01)
+	cache.put("d", value)
+	stats = cache.stats()
+	assert stats["bytes"] <= 3500
+	assert stats["evictions"] == 1
+	assert cache.get("b") == (False, None)
+	for key in ("a", "c", "d"):
+		assert cache.get(key)[0], key
+
+def test_values_larger_than_max_bytes_are_not_stored(tmp_path):
+	cache = QueryCache(path=str(tmp_path / "cache.sqlite"), max_bytes=100)
+	cache.put("big", "x" * 1000)
+	assert cache.get("big") == (False, None)
+
+def test_entries_expire_after_their_ttl(cache):
+	calls = []
+	def fn():
+		calls.append(1)
+		return len(calls)
+	assert cache.get_or_run("key", fn, ttl=0.2) == 1
+	assert cache.get_or_run("key", fn, ttl=0.2) == 1
+	time.sleep(0.3)
+	assert cache.get("key") == (False, None)
+	assert cache.get_or_run("key", fn, ttl=0.2) == 2
+
+def test_concurrent_callers_run_fn_once(cache):
+	calls = []
+	def fn():
+		calls.append(1)
+		time.sleep(0.3)
+		return "result"
+	n = 8
+	start = threading.Barrier(n)
+	results = []
+	def call():
+		start.wait()
+		results.append(cache.get_or_run("key", fn))
+	threads = [threading.Thread(target=call) for _ in range(n)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	assert results == ["result"] * n
+	assert len(calls) == 1
+	stats = cache.stats()
+	assert stats["misses"] == 1
+	assert stats["waits"] == n - 1
+
+def test_raising_fn_releases_the_lock(cache):
+	def fail():
+		raise RuntimeError("warehouse down")
+	with pytest.raises(RuntimeError):
+		cache.get_or_run("key", fail)
+	started = time.monotonic()
+	assert cache.get_or_run("key", lambda: "result") == "result"
+	# served without waiting for the lock to time out
+	assert time.monotonic() - started < 1
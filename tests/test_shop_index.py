@@ -0,0 +1,18 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from shop_index import ShopIndex
+
+from test_geography import HOLE, SQUARE
+
+def index_of(points):
+	return ShopIndex.from_rows([(n, lon, lat, "shop %d" % n, "convenience", None, None, False, False) for n, (lon, lat) in enumerate(points)])
+
+def test_within_polygon_excludes_the_boundary():
+	inside = [(-73.995, 40.701), (-73.998, 40.705)]
+	boundary = [tuple(p) for p in SQUARE["coordinates"][0][:4]] + [(-73.995, 40.7), (-73.99, 40.705), (-73.997, 40.705)]
+	outside = [(-73.98, 40.705), (-73.995, 40.705)]
+	index = index_of(inside + boundary + outside)
+	found = sorted(index.ids[i] for i in index.within_polygon(SQUARE["coordinates"] + [HOLE]))
+	assert found == [0, 1]
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+import math
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
+# Lightweight tracing for queries, fetches, map rendering and page runs.
+# Finished spans go into a bounded ring buffer shared by all sessions; the
+# buffer is summarized per span kind and name, and exported in the OpenMetrics
+# text format for a scraper or a local file.
+
+# kind is "page", "query", "fetch" or "map"; cache tells where a result came
+# from: "memo", "shared" or "prefetch" (the shared cache, reached directly or
+# by a prefetch) or "warehouse" for queries; "hit" (rendered HTML reused),
+# "render" (built map reused, but rendered again) or "miss" for maps
+Span = namedtuple("Span", "start seconds kind name session page cache rows bytes query_id")
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# results are lists of tuples or Arrow tables (None when empty)
+def result_rows(result):
+	if result is None:
+		return 0
+	return result.num_rows if hasattr(result, "num_rows") else len(result)
+
+# rows and an estimate of the bytes fetched
+def result_size(result):
+	if result is None or hasattr(result, "nbytes"):
+		return result_rows(result), 0 if result is None else result.nbytes
+	size = 0
+	for row in result:
+		for value in row:
+			size += len(value) if isinstance(value, (str, bytes, bytearray)) else 8
+	return len(result), size
+
+def quantile(values, q):
+	values = sorted(values)
+	return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))] if values else 0.0
+
+class Tracer:
+	def __init__(self, max_spans=10000):
+		self._spans = deque(maxlen=max_spans)
+		self._lock = threading.Lock()
+		self._local = threading.local()
+		self.last_write = 0.0
+
+	# session and page of the spans recorded by this thread
+	def context(self):
+		return getattr(self._local, "context", {"session": None, "page": None})
+
+	def set_context(self, session=None, page=None):
+		self._local.context = {"session": session, "page": page}
+
+	# fn run in another thread with the caller's context, for executor submissions
+	def bind(self, fn):
+		context = self.context()
+		def bound(*args, **kwargs):
+			self._local.context = context
+			return fn(*args, **kwargs)
+		return bound
+
+	# fields of the innermost open span of this thread, or a throwaway dict
+	def current(self):
+		stack = self._stack()
+		return stack[-1] if stack else {}
+
+	def _stack(self):
+		if not hasattr(self._local, "stack"):
+			self._local.stack = []
+		return self._local.stack
+
+	def annotate(self, **fields):
+		self.current().update(fields)
+
+	def begin(self, kind, name, **fields):
+		span = dict(self.context(), kind=kind, name=name, cache=None, rows=None, bytes=None, query_id=None)
+		span.update(fields)
+		span["start"] = time.time()
+		span["_clock"] = time.perf_counter()
+		self._stack().append(span)
+		return span
+
+	def end(self, span):
+		seconds = time.perf_counter() - span.pop("_clock")
+		self._local.stack = [s for s in self._stack() if s is not span]
+		with self._lock:
+			self._spans.append(Span(seconds=seconds, **span))
+
+	@contextmanager
+	def span(self, kind, name, **fields):
+		span = self.begin(kind, name, **fields)
+		try:
+			yield span
+		finally:
+			self.end(span)
+
+	def spans(self, session=None):
+		with self._lock:
+			spans = list(self._spans)
+		return spans if session is None else [s for s in spans if s.session == session]
+
+	# per (kind, name): count, total and quantile seconds, rows, bytes and cache hit ratio
+	def summary(self, session=None):
+		groups = {}
+		for s in self.spans(session):
+			groups.setdefault((s.kind, s.name), []).append(s)
+		rows = []
+		for (kind, name), spans in sorted(groups.items()):
+			seconds = [s.seconds for s in spans]
+			cached = [s for s in spans if s.cache is not None]
+			hits = [s for s in cached if s.cache not in ("warehouse", "miss", "render")]
+			rows.append({
+				"kind": kind,
+				"name": name,
+				"count": len(spans),
+				"total_seconds": sum(seconds),
+				**{"p%d_seconds" % round(q * 100): quantile(seconds, q) for q in QUANTILES},
+				"max_seconds": max(seconds),
+				"rows": sum(s.rows or 0 for s in spans),
+				"bytes": sum(s.bytes or 0 for s in spans),
+				"hit_ratio": len(hits) / len(cached) if cached else None,
+			})
+		return rows
+
+	# OpenMetrics text: a summary per span kind and name, a counter of spans
+	# per cache outcome, and gauges for the extra {name: {field: value}} stats
+	def openmetrics(self, gauges=None):
+		lines = ["# TYPE geo_hol_span_seconds summary", "# UNIT geo_hol_span_seconds seconds", "# HELP geo_hol_span_seconds Duration of traced spans in the ring buffer."]
+		spans = self.spans()
+		groups = {}
+		for s in spans:
+			groups.setdefault((s.kind, s.name), []).append(s.seconds)
+		for (kind, name), seconds in sorted(groups.items()):
+			labels = 'kind="%s",name="%s"' % (_escape(kind), _escape(name))
+			for q in QUANTILES:
+				lines.append('geo_hol_span_seconds{%s,quantile="%s"} %.6f' % (labels, q, quantile(seconds, q)))
+			lines.append("geo_hol_span_seconds_sum{%s} %.6f" % (labels, sum(seconds)))
+			lines.append("geo_hol_span_seconds_count{%s} %d" % (labels, len(seconds)))
+		lines += ["# TYPE geo_hol_span_cache counter", "# HELP geo_hol_span_cache Traced spans by cache outcome."]
+		outcomes = {}
+		for s in spans:
+			if s.cache is not None:
+				outcomes[s.kind, s.cache] = outcomes.get((s.kind, s.cache), 0) + 1
+		for (kind, cache), count in sorted(outcomes.items()):
+			lines.append('geo_hol_span_cache_total{kind="%s",cache="%s"} %d' % (_escape(kind), _escape(cache), count))
+		for source, values in sorted((gauges or {}).items()):
+			lines += ["# TYPE geo_hol_%s gauge" % source]
+			for field, value in sorted(values.items()):
+				if isinstance(value, (int, float)):
+					lines.append('geo_hol_%s{field="%s"} %s' % (source, _escape(field), value))
+		lines.append("# EOF")
+		return "\n".join(lines) + "\n"
+
+	# write the OpenMetrics text atomically, for a textfile collector
+	def write(self, path, gauges=None):
+		temp = "%s.%d.%d.tmp" % (path, os.getpid(), threading.get_ident())
+		with open(temp, "w") as f:
+			f.write(self.openmetrics(gauges))
+		os.replace(temp, path)
+		self.last_write = time.time()
+
+def _escape(value):
+	return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")